@@ -1,3 +1,13 @@
+import heapq
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError: # only the NumPy backend (groupTotalsNumpy, tallyCaloriesNumpy) needs NumPy
+    np = None
+
 def maxCalories() -> int:
     f = open("1_input.txt", "r")
     max_cals = 0
@@ -27,8 +37,205 @@ def top3() -> int:
     f.close()
     return sum(cals[0:3])
 
+class CalorieTally:
+    """
+    Single-pass aggregator over the elf totals. Memory is bounded by k no matter how many elves there are:
+    - the k largest totals are kept in a min-heap, so the smallest of them sits at heap[0] and is the one evicted
+    - max, count, and sum are running values, so mean comes for free
+    """
+    def __init__(self, k: int = 3):
+        self.k = k
+        self.heap = []      # min-heap of the k largest totals seen so far
+        self.maxCals = 0
+        self.count = 0
+        self.total = 0
+
+    def add(self, cals: int) -> None:
+        self.maxCals = max(self.maxCals, cals)
+        self.count += 1
+        self.total += cals
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, cals)
+        elif cals > self.heap[0]:
+            heapq.heapreplace(self.heap, cals)
+
+    def merge(self, other) -> None:
+        # fold another tally (ex: from a different part of the file) into this one
+        self.maxCals = max(self.maxCals, other.maxCals)
+        self.count += other.count
+        self.total += other.total
+        for cals in other.heap:
+            if len(self.heap) < self.k:
+                heapq.heappush(self.heap, cals)
+            elif cals > self.heap[0]:
+                heapq.heapreplace(self.heap, cals)
+
+    def topK(self) -> list[int]:
+        return sorted(self.heap, reverse=True)
+
+    def topKSum(self) -> int:
+        return sum(self.heap)
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+def tallyLines(lines, k: int = 3) -> CalorieTally:
+    # Lines are consumed one at a time, so any iterable of str or bytes works (an open file, an mmap slice, a list in tests)
+    tally = CalorieTally(k)
+    groupTotal = 0
+    inGroup = False
+    for line in lines:
+        line = line.strip()
+        if not line:
+            if inGroup:
+                tally.add(groupTotal)
+            groupTotal = 0
+            inGroup = False
+        else:
+            groupTotal += int(line)
+            inGroup = True
+    if inGroup: # the last elf isn't followed by a blank line
+        tally.add(groupTotal)
+    return tally
+
+def tallyCalories(path: str = "1_input.txt", k: int = 3) -> CalorieTally:
+    with open(path, "r") as f:
+        return tallyLines(f, k)
+
+def findGroupStart(mm, pos: int) -> int:
+    """
+    Return the offset of the first elf group that starts at or after pos, i.e. the first line following a blank line.
+    Chunk boundaries are snapped to these offsets so that no group is ever split between two workers.
+    """
+    if pos <= 0:
+        return 0
+    size = len(mm)
+    lineStart = mm.rfind(b"\n", 0, pos) + 1 # back up to the start of the line pos falls on
+    sawBlank = False
+    while lineStart < size:
+        lineEnd = mm.find(b"\n", lineStart)
+        if lineEnd == -1:
+            lineEnd = size
+        isBlank = mm[lineStart:lineEnd].strip() == b""
+        if sawBlank and not isBlank:
+            return lineStart
+        sawBlank = sawBlank or isBlank
+        lineStart = lineEnd + 1
+    return size
+
+def readMappedLines(mm, start: int, end: int):
+    # Yield the lines of mm[start:end] one at a time, reading straight from the mapping. start and end are line starts.
+    mm.seek(start)
+    while mm.tell() < end:
+        yield mm.readline()
+
+def tallyChunk(path: str, start: int, end: int, k: int) -> CalorieTally:
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return tallyLines(readMappedLines(mm, start, end), k)
+
+def tallyCaloriesParallel(path: str = "1_input.txt", k: int = 3, workers: int = None) -> CalorieTally:
+    """
+    Split the file into roughly equal byte ranges, snap each boundary forward to the start of an elf group,
+    reduce every range to its own top-k tally in a separate process, then merge the tallies.
+    """
+    workers = workers or os.cpu_count() or 1
+    if os.path.getsize(path) == 0:
+        return CalorieTally(k)
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        size = len(mm)
+        bounds = [findGroupStart(mm, size * w // workers) for w in range(workers)] + [size]
+    chunks = [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+    tally = CalorieTally(k)
+    if len(chunks) <= 1:
+        for start, end in chunks:
+            tally.merge(tallyChunk(path, start, end, k))
+        return tally
+    with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+        futures = [pool.submit(tallyChunk, path, start, end, k) for start, end in chunks]
+        for future in futures:
+            tally.merge(future.result())
+    return tally
+
+def groupTotalsNumpy(buf: bytes):
+    """
+    Vectorized parse of the whole buffer into one total per elf group, with no per-line Python work:
+    - keep only digits and newlines (so "\r" and whitespace-only lines can't hide a blank line)
+    - every run of digits is a number; its value is the sum of digit * 10^(distance from the end of the run)
+    - a blank line is two newlines in a row, and the number of blank lines before a number is its group id
+    - np.add.reduceat over the numbers, split wherever the group id changes, gives each group's total
+    """
+    data = np.frombuffer(buf, dtype=np.uint8)
+    isDigit = (data >= ord("0")) & (data <= ord("9"))
+    data = data[isDigit | (data == ord("\n"))]
+    isDigit = data != ord("\n")
+    if not isDigit.any():
+        return np.zeros(0, dtype=np.int64)
+
+    edges = np.diff(isDigit.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)  # index of the first digit of each number
+    ends = np.flatnonzero(edges == -1)   # index one past the last digit of each number
+    runLengths = ends - starts
+    digitIdx = np.flatnonzero(isDigit)
+    runEnds = np.repeat(ends, runLengths)
+    places = np.power(10, runEnds - digitIdx - 1, dtype=np.int64)
+    digitValues = (data[digitIdx] - ord("0")).astype(np.int64) * places
+    values = np.add.reduceat(digitValues, np.concatenate(([0], np.cumsum(runLengths)[:-1])))
+
+    isNewline = ~isDigit
+    blankLine = np.zeros(len(data), dtype=np.int64)
+    blankLine[1:] = isNewline[1:] & isNewline[:-1]
+    groupIds = np.cumsum(blankLine)[starts]
+    groupStarts = np.flatnonzero(np.diff(groupIds, prepend=-1) != 0)
+    return np.add.reduceat(values, groupStarts)
+
+def tallyCaloriesNumpy(path: str = "1_input.txt", k: int = 3) -> CalorieTally:
+    with open(path, "rb") as f:
+        totals = groupTotalsNumpy(f.read())
+    tally = CalorieTally(k)
+    if len(totals) == 0:
+        return tally
+    top = totals if len(totals) <= k else np.partition(totals, len(totals) - k)[-k:]
+    tally.heap = sorted(int(cals) for cals in top) # ascending order is a valid min-heap
+    tally.maxCals = int(totals.max())
+    tally.count = len(totals)
+    tally.total = int(totals.sum())
+    return tally
+
+def testTallyLines():
+    lines = ["1000", "2000", "3000", "", "4000", "", "5000", "6000", "", "7000", "8000", "9000", "", "10000"]
+    tally = tallyLines(lines)
+    assert(tally.maxCals == 24000)
+    assert(tally.topK() == [24000, 11000, 10000])
+    assert(tally.topKSum() == 45000)
+    assert(tally.count == 5)
+    assert(tally.total == 55000)
+    assert(tallyLines(lines, k=1).topK() == [24000])
+    assert(tallyLines(lines, k=10).topK() == [24000, 11000, 10000, 6000, 4000])
+
+def testTallyCaloriesParallel():
+    serial = tallyCalories()
+    for workers in (1, 2, 3, 7, 64):
+        parallel = tallyCaloriesParallel(workers=workers)
+        assert(parallel.topK() == serial.topK())
+        assert((parallel.maxCals, parallel.count, parallel.total) == (serial.maxCals, serial.count, serial.total))
+
+def testTallyCaloriesNumpy():
+    buf = b"1000\n2000\n3000\n\n4000\n\n5000\r\n6000\r\n  \n7000\n8000\n9000\n\n\n10000"
+    assert(groupTotalsNumpy(buf).tolist() == [6000, 4000, 11000, 24000, 10000])
+    assert(groupTotalsNumpy(b"\n\n").tolist() == [])
+    serial = tallyCalories()
+    vectorized = tallyCaloriesNumpy()
+    assert(vectorized.topK() == serial.topK())
+    assert((vectorized.maxCals, vectorized.count, vectorized.total) == (serial.maxCals, serial.count, serial.total))
+
 def main():
-    print(maxCalories())
-    print(top3())
+    tally = tallyCalories()
+    print(tally.maxCals)
+    print(tally.topKSum())
 
-main()
\ No newline at end of file
+if __name__ == "__main__": # guard so that pool workers can import this module without re-running it
+    testTallyLines()
+    testTallyCaloriesParallel()
+    if np is not None:
+        testTallyCaloriesNumpy()
+    main()
\ No newline at end of file
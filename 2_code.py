@@ -12,6 +12,12 @@ A beats Z
 B beats X
 C beats Y
 """
+from collections import Counter
+
+try:
+    import numpy as np
+except ImportError: # only countRoundsNumpy needs NumPy
+    np = None
 
 DECODER_DICT = dict()
 DECODER_DICT["A"] = DECODER_DICT["X"] = "R"
@@ -82,4 +88,98 @@ def part2():
     myScore = sum(map(lambda x: x[1], scores))
     print(f'My score: {myScore}')
 
-part2()
\ No newline at end of file
+def buildScoreTables() -> tuple[dict[bytes, int], dict[bytes, int]]:
+    """
+    Every round is one of only 9 lines ("A X" .. "C Z"), so score each of them once for both parts.
+    Part 1 reads the second column as my selection, part 2 reads it as the desired result.
+    """
+    part1_table = dict()
+    part2_table = dict()
+    for opponent_code in "ABC":
+        for second_code in "XYZ":
+            line = f"{opponent_code} {second_code}".encode()
+            opponent_selection = DECODER_DICT[opponent_code]
+            part1_table[line] = calculateRoundScores(opponent_selection, DECODER_DICT[second_code])[1]
+            part2_table[line] = calculateRoundScores(opponent_selection, getSelection(opponent_selection, second_code))[1]
+    return part1_table, part2_table
+
+PART1_TABLE, PART2_TABLE = buildScoreTables()
+
+def scoreCounts(counts: Counter) -> tuple[int, int]:
+    # counts maps each distinct round line to the number of times it was played
+    part1_score = sum(PART1_TABLE[line] * n for line, n in counts.items())
+    part2_score = sum(PART2_TABLE[line] * n for line, n in counts.items())
+    return part1_score, part2_score
+
+def scoreLines(lines) -> tuple[int, int]:
+    # Counter and bytes.strip both run in C, so nothing is built per round beyond the stripped key
+    return scoreCounts(Counter(map(bytes.strip, lines)))
+
+ROUND_LINES = list(PART1_TABLE.keys()) # the 9 possible rounds, ordered "A X", "A Y", .. "C Z"
+
+def countRounds(buf: bytes) -> Counter:
+    # Letters never sit on both sides of a space across a line break, so each pattern can only match a whole round
+    return Counter({line: buf.count(line) for line in ROUND_LINES})
+
+def countRoundsNumpy(buf: bytes) -> Counter:
+    # Encode each round as 3 * (opponent - "A") + (second - "X") from the bytes around its space, then bincount.
+    # Like countRounds(), only a space between an "A".."C" and an "X".."Z" is a round, so stray whitespace is ignored.
+    data = np.frombuffer(buf, dtype=np.uint8)
+    spaces = np.flatnonzero(data[1:-1] == ord(" ")) + 1 # skip a space at either end, which has no neighbour
+    opponent = data[spaces - 1].astype(np.intp) - ord("A")
+    second = data[spaces + 1].astype(np.intp) - ord("X")
+    isRound = (opponent >= 0) & (opponent < 3) & (second >= 0) & (second < 3)
+    codes = opponent[isRound] * 3 + second[isRound]
+    histogram = np.bincount(codes, minlength=len(ROUND_LINES))
+    return Counter({line: int(n) for line, n in zip(ROUND_LINES, histogram)})
+
+def scoreFile(path: str = "2_input.txt", chunk_size: int = 1 << 24, counter=countRounds) -> tuple[int, int]:
+    """
+    Read the file in fixed-size chunks and only keep 9 counts between them, so memory doesn't grow with the log.
+    Each chunk is cut at its last newline and the partial round is carried into the next chunk.
+    """
+    counts = Counter()
+    carry = b""
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            chunk = carry + chunk
+            cut = chunk.rfind(b"\n") + 1
+            carry = chunk[cut:]
+            counts.update(counter(chunk[:cut]))
+    if carry:
+        counts.update(counter(carry))
+    return scoreCounts(counts)
+
+def testScoreTables():
+    assert(len(PART1_TABLE) == 9 and len(PART2_TABLE) == 9)
+    assert(scoreLines([b"A Y\n", b"B X\n", b"C Z\n"]) == (15, 12))
+    assert(scoreCounts(Counter({b"A Y": 2, b"C Z": 1})) == (22, 15))
+
+def testScoreFile():
+    buf = b"A Y\nB X\r\nC Z\nC Z"
+    assert(scoreCounts(countRounds(buf)) == (21, 19))
+    whitespace = (b"A Y \nB X\n", b" A Y\n B X \n", b"A Y\nB X ", b" A Y\nB X")
+    for padded in whitespace:
+        assert(scoreCounts(countRounds(padded)) == (9, 5))
+    with open("2_input.txt", "rb") as f:
+        expected = scoreLines(f)
+    for chunk_size in (1, 5, 4096, 1 << 24):
+        assert(scoreFile(chunk_size=chunk_size) == expected)
+
+    if np is not None:
+        assert(countRounds(buf) == countRoundsNumpy(buf))
+        for padded in whitespace:
+            assert(countRounds(padded) == countRoundsNumpy(padded))
+        assert(scoreFile(chunk_size=1000, counter=countRoundsNumpy) == expected)
+
+def main():
+    part1_score, part2_score = scoreFile()
+    print(f'My score (part 1): {part1_score}')
+    print(f'My score (part 2): {part2_score}')
+
+testScoreTables()
+testScoreFile()
+main()
\ No newline at end of file
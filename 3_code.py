@@ -1,3 +1,5 @@
+from itertools import islice
+
 def getCommonType(rucksack_contents: str) -> str:
     mid = int(len(rucksack_contents) / 2)
     compartment_1 = rucksack_contents[0:mid]
@@ -33,27 +35,96 @@ def getPriority(t: str) -> int:
     else:
         return ord(t) - 96
 
+TYPE_BITS = {t: 1 << (getPriority(t) - 1) for t in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"}
+
+def getTypeMask(items) -> int:
+    # bit (priority - 1) is set for every item type present, so a-z use bits 0-25 and A-Z use bits 26-51
+    mask = 0
+    for t in set(items):
+        mask |= TYPE_BITS[t]
+    return mask
+
+def getCommonPriority(*item_groups: str) -> int:
+    """
+    Intersect every group of items and return the priority of the common type.
+    The intersection runs on sets (in C) rather than one Python step per character, so only the few common types
+    are turned into a mask. The priority is just the position of the set bit, which bit_length() gives us directly.
+    """
+    common = getTypeMask(set(item_groups[0]).intersection(*item_groups[1:]))
+    if common == 0:
+        raise Exception(f"Couldn't find a common type between: {', '.join(item_groups)}")
+    return common.bit_length()
+
+def getCompartmentsPriority(rucksack_contents: str) -> int:
+    # same as getCommonPriority() on the two halves, without the argument packing (this runs once per line)
+    mid = len(rucksack_contents) // 2
+    common = 0
+    for t in set(rucksack_contents[0:mid]).intersection(rucksack_contents[mid:]):
+        common |= TYPE_BITS[t]
+    if common == 0:
+        raise Exception(f"Couldn't find a common type between the compartments: {rucksack_contents[0:mid]}, {rucksack_contents[mid:]}")
+    return common.bit_length()
+
+def getBadgePriorities(lines, group_size: int = 3):
+    """
+    Yield the badge priority of each group of {group_size} rucksacks, pulling one group's worth of lines
+    at a time from the iterator and folding each line into a running intersection, so no more than one group is ever held.
+    """
+    rucksacks = filter(None, map(str.strip, lines)) # blank lines (like a trailing one) aren't rucksacks
+    while True:
+        group = islice(rucksacks, group_size)
+        first = next(group, None)
+        if first is None:
+            return
+        common = set(first) # item types shared by every rucksack of the group read so far
+        n_read = 1
+        for rucksack in group:
+            common.intersection_update(rucksack)
+            n_read += 1
+        if n_read < group_size:
+            raise Exception(f"Incomplete group at the end of the input: expected {group_size} rucksacks, got {n_read}")
+        mask = 0
+        for t in common:
+            mask |= TYPE_BITS[t]
+        if mask == 0:
+            raise Exception(f"Couldn't find a common type in a group of {group_size} rucksacks")
+        yield mask.bit_length()
+
 def part1():
     f = open("3_input.txt", "r")
     s = 0
     for line in f.readlines():
         rucksack_contents = line.strip()
-        t = getCommonType(rucksack_contents)
-        p = getPriority(t)
-        s += p
+        s += getCompartmentsPriority(rucksack_contents)
     f.close()
     print(s)
 
-def part2():
-    f = open("3_input.txt", "r")
-    lines = [s.strip() for s in f.readlines()]
-    num_groups = int(len(lines) / 3)
-    s = 0
-    for g in range(num_groups):
-        rucksacks_in_group = lines[3*g : 3*g + 3]
-        t = getCommonTypePart2(rucksacks_in_group)
-        p = getPriority(t)
-        s += p
-    f.close()
-    print(s)
+def part2(group_size: int = 3):
+    with open("3_input.txt", "r") as f:
+        print(sum(getBadgePriorities(f, group_size)))
+def testGetCommonPriority():
+    rucksacks = [
+        "vJrwpWtwJgWrhcsFMMfFFhFp",
+        "jqHRNqRjqzjGDLGLrsFMfFZSrLrFZsSL",
+        "PmmdzqPrVvPwwTWBwg",
+        "wMqvLMZHhHMvwLHjbvcjnnSBnvTQFn",
+        "ttgJtRGJQctTZtZT",
+        "CrZsJsPPZsGzwwsLwLmpwMDw"
+    ]
+    assert(getTypeMask("aA") == (1 << 0) | (1 << 26))
+    for rucksack in rucksacks:
+        assert(getCompartmentsPriority(rucksack) == getPriority(getCommonType(rucksack)))
+    assert(getCommonPriority(*rucksacks[0:3]) == 18) # r
+    assert(getCommonPriority(*rucksacks[3:6]) == 52) # Z
+    assert(list(getBadgePriorities(rucksacks)) == [18, 52])
+    assert(list(getBadgePriorities(rucksacks[0:2], group_size=2)) == [getCommonPriority(*rucksacks[0:2])])
+    assert(list(getBadgePriorities([r + "\n" for r in rucksacks[0:3]] + ["\n"])) == [18])
+    assert(list(getBadgePriorities(rucksacks[0:1] + ["", "  "] + rucksacks[1:3])) == [18])
+    try:
+        list(getBadgePriorities(rucksacks[0:4]))
+        assert(False)
+    except Exception as e:
+        assert("Incomplete group" in str(e))
+
+testGetCommonPriority()
 part2()
\ No newline at end of file
@@ -1,3 +1,10 @@
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError: # only the NumPy path (parseAssignments, countContainsAndOverlaps) needs NumPy
+    np = None
+
 def fullyContains(a: str, b: str) -> bool:
     a1, a2 = [int(c) for c in a.split("-")]
     b1, b2 = [int(c) for c in b.split("-")]
@@ -37,4 +44,170 @@ def part2():
     f.close()
     print(s)
 
-part2()
\ No newline at end of file
+def parseAssignments(buf: bytes):
+    """
+    Parse every "a1-a2,b1-b2" line in the buffer into one row of an (n, 4) integer array, straight from the bytes.
+    Dashes, commas and line breaks are the only separators, so every run of digits is one number:
+    its value is the sum of digit * 10^(distance from the end of the run), summed per run with np.add.reduceat.
+    """
+    data = np.frombuffer(buf, dtype=np.uint8)
+    isDigit = (data >= ord("0")) & (data <= ord("9"))
+    if not isDigit.any():
+        return np.zeros((0, 4), dtype=np.int64)
+
+    edges = np.diff(isDigit.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)  # index of the first digit of each number
+    ends = np.flatnonzero(edges == -1)   # index one past the last digit of each number
+    digitIdx = np.flatnonzero(isDigit)
+    places = np.power(10, np.repeat(ends, ends - starts) - digitIdx - 1, dtype=np.int64)
+    digitValues = (data[digitIdx] - ord("0")).astype(np.int64) * places
+    numbers = np.add.reduceat(digitValues, np.concatenate(([0], np.cumsum(ends - starts)[:-1])))
+    return numbers.reshape(-1, 4)
+
+def countContainsAndOverlaps(assignments) -> tuple[int, int]:
+    """
+    Both answers from the same array:
+    - part 1: one range contains the other
+    - part 2: the ranges overlap, which is just "neither range ends before the other one starts"
+    """
+    a1, a2, b1, b2 = assignments.T
+    contains = ((a1 <= b1) & (a2 >= b2)) | ((b1 <= a1) & (b2 >= a2))
+    overlapping = (a1 <= b2) & (b1 <= a2)
+    return int(contains.sum()), int(overlapping.sum())
+
+class IntervalNode:
+    def __init__(self, center: int, intervals: list, left, right):
+        self.center = center
+        self.byStart = sorted(intervals, key=lambda i: i[0])                # intervals containing center, by start
+        self.byEnd = sorted(intervals, key=lambda i: i[1], reverse=True)    # the same intervals, latest end first
+        self.left = left                                                    # intervals ending before center
+        self.right = right                                                  # intervals starting after center
+
+class IntervalTree:
+    """
+    Static centered interval tree over the section ranges of every assignment in the file.
+    Intervals are (start, end, line) tuples where line is the 0-based line the range came from.
+
+    Each node's center is the median start of the intervals it was built from, so the interval with that start
+    always lands in the node. No node is empty, which keeps queries at O(log n + k) for k reported intervals.
+    """
+    def __init__(self, intervals: list[tuple[int, int, int]]):
+        self.size = len(intervals)
+        self.root = IntervalTree.build(intervals)
+        self.starts = sorted(i[0] for i in intervals)
+        self.ends = sorted(i[1] for i in intervals)
+
+    @staticmethod
+    def build(intervals):
+        if len(intervals) == 0:
+            return None
+        center = sorted(i[0] for i in intervals)[len(intervals) // 2]
+        left = [i for i in intervals if i[1] < center]
+        right = [i for i in intervals if i[0] > center]
+        here = [i for i in intervals if i[0] <= center <= i[1]]
+        return IntervalNode(center, here, IntervalTree.build(left), IntervalTree.build(right))
+
+    @staticmethod
+    def fromAssignments(assignments):
+        # each row (a1, a2, b1, b2) holds two ranges that both belong to that line; pass parseAssignments(buf).tolist()
+        intervals = []
+        for line, (a1, a2, b1, b2) in enumerate(assignments):
+            intervals.append((a1, a2, line))
+            intervals.append((b1, b2, line))
+        return IntervalTree(intervals)
+
+    def overlapping(self, lo: int, hi: int) -> list[tuple[int, int, int]]:
+        # every interval sharing at least one section with [lo, hi]
+        found = []
+        toVisit = [self.root]
+        while len(toVisit) != 0:
+            node = toVisit.pop()
+            if node is None:
+                continue
+            if hi < node.center: # only intervals starting at or before hi can reach the query
+                for interval in node.byStart:
+                    if interval[0] > hi:
+                        break
+                    found.append(interval)
+                toVisit.append(node.left)
+            elif lo > node.center: # only intervals ending at or after lo can reach the query
+                for interval in node.byEnd:
+                    if interval[1] < lo:
+                        break
+                    found.append(interval)
+                toVisit.append(node.right)
+            else: # the query covers the center, so every interval in this node overlaps it
+                found.extend(node.byStart)
+                toVisit.append(node.left)
+                toVisit.append(node.right)
+        return found
+
+    def stabbing(self, section: int) -> list[tuple[int, int, int]]:
+        return self.overlapping(section, section)
+
+    def countOverlapping(self, lo: int, hi: int) -> int:
+        # intervals that miss [lo, hi] either end before lo or start after hi, and never both
+        return self.size - bisect_right(self.ends, lo - 1) - (self.size - bisect_right(self.starts, hi))
+
+    def countOverlappingPairs(self) -> int:
+        """
+        Count the pairs of intervals (from any lines) that share a section, in O(n log n).
+        Two intervals are disjoint exactly when one ends before the other starts, so each disjoint pair is counted
+        once by looking up, for every interval, how many intervals start after it ends.
+        """
+        disjoint = 0
+        for end in self.ends:
+            disjoint += self.size - bisect_right(self.starts, end)
+        return self.size * (self.size - 1) // 2 - disjoint
+
+def parts1and2():
+    if np is None: # the line-by-line versions give the same answers without NumPy
+        part1()
+        part2()
+        return
+    with open("4_input.txt", "rb") as f:
+        assignments = parseAssignments(f.read())
+    contains, overlapping = countContainsAndOverlaps(assignments)
+    print(contains)
+    print(overlapping)
+
+def testCountContainsAndOverlaps():
+    assert(parseAssignments(b"").shape == (0, 4))
+    assert(parseAssignments(b"10-200,3000-40000\r\n").tolist() == [[10, 200, 3000, 40000]])
+    buf = b"2-4,6-8\n2-3,4-5\n5-7,7-9\n2-8,3-7\n6-6,4-6\n2-6,4-8\n"
+    assignments = parseAssignments(buf)
+    assert(assignments.shape == (6, 4))
+    assert(assignments[3].tolist() == [2, 8, 3, 7])
+    assert(countContainsAndOverlaps(assignments) == (2, 4))
+    for line in buf.decode().split():
+        first, second = line.split(",")
+        row = parseAssignments(line.encode())
+        assert(countContainsAndOverlaps(row) == (int(fullyContains(first, second)), int(overlaps(first, second))))
+
+def testIntervalTree():
+    lines = ["2-4,6-8", "2-3,4-5", "5-7,7-9", "2-8,3-7", "6-6,4-6", "2-6,4-8"]
+    rows = [[int(n) for n in line.replace(",", "-").split("-")] for line in lines]
+    tree = IntervalTree.fromAssignments(rows)
+    intervals = [(a, b, line) for line, row in enumerate(rows) for a, b in (row[0:2], row[2:4])]
+    for lo in range(0, 11):
+        for hi in range(lo, 11):
+            expected = sorted(i for i in intervals if i[0] <= hi and lo <= i[1])
+            assert(sorted(tree.overlapping(lo, hi)) == expected)
+            assert(tree.countOverlapping(lo, hi) == len(expected))
+    assert(sorted(tree.stabbing(1)) == [])
+    assert(sorted(tree.stabbing(9)) == [(7, 9, 2)])
+    expectedPairs = 0
+    for i in range(len(intervals)):
+        for j in range(i + 1, len(intervals)):
+            if intervals[i][0] <= intervals[j][1] and intervals[j][0] <= intervals[i][1]:
+                expectedPairs += 1
+    assert(tree.countOverlappingPairs() == expectedPairs)
+    if np is not None:
+        buf = ("\n".join(lines) + "\n").encode()
+        arrayTree = IntervalTree.fromAssignments(parseAssignments(buf).tolist())
+        assert(sorted(arrayTree.overlapping(0, 10)) == sorted(intervals))
+
+if np is not None:
+    testCountContainsAndOverlaps()
+testIntervalTree()
+parts1and2()
\ No newline at end of file
@@ -13,6 +13,10 @@ FILE FORMAT:
 move 3 from 8 to 9\n // 1st instruction line
 ...
 """
+import mmap
+import re
+from array import array
+
 def readStacks(f) -> list[list[int]]:
     # Get total length of first line including trailing whitespace. This is just so we can calculate the number of stacks.
     line = f.readline()
@@ -28,14 +32,14 @@ def readStacks(f) -> list[list[int]]:
     line = line.strip()
     length = len(line)
     while "1" not in line: # process lines until we see the index line
-        stk_id = 0
-        for c in range(1, length, 4): # starting at the 2nd character, check every 4th character in the line
-            if line[c] != " ":
-                stx[stk_id].append(line[c])
-            stk_id += 1
+        for stk_id, crate in enumerate(line[1:length:4]): # starting at the 2nd character, every 4th character in the line
+            if crate != " ":
+                stx[stk_id].append(crate)
         line = f.readline().strip()
         length = len(line)
     f.readline() # consume the blank line after the index line and leave the cursor on the first line of instructions
+    for stk in stx: # we read the drawing top-down, but keep the top of each stack at the end of its list
+        stk.reverse()
     return stx
 
 def parseInstruction(line: str) -> list[int]:
@@ -50,49 +54,145 @@ def parseInstruction(line: str) -> list[int]:
     raw_split = line.split()
     return int(raw_split[1]), int(raw_split[3]), int(raw_split[5])
 
-def executeInstruction(stx: list[list[str]], qty: int, from_stk: int, to_stk: int) -> None:
-    # We need to subtract 1 from every stack index because we have a zero-based index, while the instructions are 1-based
-    from_stk = from_stk - 1
-    to_stk = to_stk - 1
+def executeInstruction(stx: list[list[str]], qty: int, from_stk: int, to_stk: int, reverse: bool = True) -> None:
+    """
+    The top of each stack is the end of its list, so a move only touches the 'qty' crates being moved.
+    reverse=True is the CrateMover 9000 (part 1), which lifts one crate at a time and so flips their order.
+    reverse=False is the CrateMover 9001 (part 2), which lifts them all at once and keeps their order.
+    """
+    if qty <= 0: # from_stk[-0:] would be the whole stack
+        return
 
-    # Copy the first 'qty' items of the 'from' stack
-    to_move = stx[from_stk][0:qty]
+    # We need to subtract 1 from every stack index because we have a zero-based index, while the instructions are 1-based
+    from_stk = stx[from_stk - 1]
+    to_stk = stx[to_stk - 1]
 
-    # Add them to the front of the 'to' stack in reverse order
-    #to_move.reverse() # comment out this line for part 2
-    stx[to_stk] = to_move + stx[to_stk]
+    # Lift the top 'qty' items off the 'from' stack (before adding any, in case 'from' and 'to' are the same stack)
+    to_move = from_stk[-qty:]
+    del from_stk[-qty:]
 
-    # Remove the first 'qty' items of the 'from' stack
-    stx[from_stk] = stx[from_stk][qty:]
+    # Put them on the 'to' stack
+    if reverse:
+        to_move.reverse()
+    to_stk.extend(to_move)
 
-def main():
+def runProgram(reverse: bool) -> str:
     with open("5_input.txt", "r") as f:
         stx = readStacks(f) # this function should leave us at the first line of instructions
         line = f.readline()
         while line != "": # continue parsing instructions until we hit the end of the file
             qty, from_stk, to_stk = parseInstruction(line)
-            executeInstruction(stx, qty, from_stk, to_stk)
+            executeInstruction(stx, qty, from_stk, to_stk, reverse)
             line = f.readline()
             if line == "\n":
                 break
         stk_tops = []
         for stk in stx:
-            stk_tops.append(stk[0])
-        print(''.join(stk_tops))
+            stk_tops.append(stk[-1] if stk else " ")
+        return ''.join(stk_tops)
+
+def readInstructions(f) -> list[tuple[int, int, int]]:
+    # Read (qty, from_stk, to_stk) for every instruction line left in the file, stopping at EOF or a blank line
+    instructions = []
+    line = f.readline()
+    while line != "" and line != "\n":
+        instructions.append(parseInstruction(line))
+        line = f.readline()
+    return instructions
+
+SECTION_BREAK = re.compile(rb"\r?\n[ \t]*\r?\n") # the blank line between the drawing and the instructions
+NUMBER = re.compile(rb"\d+")
+
+def parseDrawing(drawing: bytes) -> list[list[str]]:
+    # Same layout as readStacks(), but each row is sliced into its crate column in one step, and rows are read
+    # bottom-up so that every stack comes out bottom-to-top without a final reverse
+    rows = drawing.splitlines()
+    n_stx = len(rows[-1].split()) # the index line names every stack
+    stx = [[] for _ in range(n_stx)]
+    for row in reversed(rows[:-1]):
+        for stk_id, crate in enumerate(row[1::4].decode()):
+            if crate != " ":
+                stx[stk_id].append(crate)
+    return stx
+
+def readProgram(path: str = "5_input.txt") -> tuple[list[list[str]], array]:
+    """
+    Read the stacks and every instruction through an mmap of the file.
+    Instruction lines hold exactly three numbers each, so pulling every number out of the instruction section
+    gives the packed (qty, from_stk, to_stk) triples directly. finditer feeds them into the array one at a time,
+    so no list of matched bytes is built along the way.
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        section_break = SECTION_BREAK.search(mm)
+        stx = parseDrawing(mm[:section_break.start()])
+        program = array("I", (int(m.group()) for m in NUMBER.finditer(mm, section_break.end())))
+    return stx, program
+
+def executeProgram(stx: list[list[str]], program: array, reverse: bool = True) -> None:
+    # run every packed (qty, from_stk, to_stk) triple
+    steps = iter(program)
+    for qty, from_stk, to_stk in zip(steps, steps, steps):
+        executeInstruction(stx, qty, from_stk, to_stk, reverse)
+
+def getTopsByTracingBack(stx: list[list[str]], instructions: list[tuple[int, int, int]], reverse: bool = True) -> str:
+    """
+    Find the top crate of every stack without moving any crates.
+
+    We only care where each final top came from, so we start from (stack, depth 0) for every stack and walk the
+    instructions backwards, undoing each one for that single position (depth counts down from the top):
+    - if it is one of the 'qty' crates that landed on the 'to' stack, it was at depth d (9001) or qty - 1 - d (9000)
+      of the 'from' stack
+    - if it is below them on the 'to' stack, it was 'qty' crates higher
+    - if it is on the 'from' stack, it was 'qty' crates lower
+    Where it ends up is a position in the starting stacks. That's O(instructions * stacks), whatever qty and the
+    stack heights are. One forward pass over the stack heights tells us which stacks end up empty.
+    """
+    heights = [len(stk) for stk in stx]
+    for qty, from_stk, to_stk in instructions:
+        heights[from_stk - 1] -= qty
+        heights[to_stk - 1] += qty
+
+    positions = [(stk, 0) for stk in range(len(stx))]
+    for qty, from_stk, to_stk in reversed(instructions):
+        from_stk -= 1
+        to_stk -= 1
+        for p, (stk, depth) in enumerate(positions):
+            if from_stk == to_stk:
+                if stk == to_stk and depth < qty and reverse:
+                    positions[p] = (stk, qty - 1 - depth)
+            elif stk == to_stk:
+                if depth < qty:
+                    positions[p] = (from_stk, qty - 1 - depth if reverse else depth)
+                else:
+                    positions[p] = (stk, depth - qty)
+            elif stk == from_stk:
+                positions[p] = (stk, depth + qty)
+
+    stk_tops = []
+    for final_stk, (stk, depth) in enumerate(positions):
+        stk_tops.append(stx[stk][-1 - depth] if heights[final_stk] > 0 else " ")
+    return ''.join(stk_tops)
+
+def main():
+    start, program = readProgram()
+    for reverse in (True, False): # part 1, then part 2, each on its own copy of the starting stacks
+        stx = [list(stk) for stk in start]
+        executeProgram(stx, program, reverse)
+        print(''.join(stk[-1] if stk else " " for stk in stx))
 
 def testReadStacks():
     with open("5_input.txt", "r") as f:
         stx = readStacks(f)
         assert(len(stx) == 9)
-        assert(stx[0][0] == 'T' and len(stx[0]) == 8)
-        assert(stx[1][0] == 'R' and len(stx[1]) == 3)
-        assert(stx[2][0] == 'D' and len(stx[2]) == 8)
-        assert(stx[3][0] == 'G' and len(stx[3]) == 7)
-        assert(stx[4][0] == 'H' and len(stx[4]) == 5)
-        assert(stx[5][0] == 'L' and len(stx[5]) == 8)
-        assert(stx[6][0] == 'L' and len(stx[6]) == 6)
-        assert(stx[7][0] == 'R' and len(stx[7]) == 4)
-        assert(stx[8][0] == 'H' and len(stx[8]) == 7)
+        assert(stx[0][-1] == 'T' and len(stx[0]) == 8)
+        assert(stx[1][-1] == 'R' and len(stx[1]) == 3)
+        assert(stx[2][-1] == 'D' and len(stx[2]) == 8)
+        assert(stx[3][-1] == 'G' and len(stx[3]) == 7)
+        assert(stx[4][-1] == 'H' and len(stx[4]) == 5)
+        assert(stx[5][-1] == 'L' and len(stx[5]) == 8)
+        assert(stx[6][-1] == 'L' and len(stx[6]) == 6)
+        assert(stx[7][-1] == 'R' and len(stx[7]) == 4)
+        assert(stx[8][-1] == 'H' and len(stx[8]) == 7)
 
 def testParseInstruction():
     instructions = [
@@ -107,21 +207,22 @@ def testParseInstruction():
         assert(parseInstruction(s) == parsed[i])
 
 def testExecuteInstruction():
+    # the top of each stack is the last element
     stx = [
-        ["C", "B", "A"],
-        ["D", "E", "F"]
+        ["A", "B", "C"],
+        ["F", "E", "D"]
     ]
     stxState1 = [
         [],
-        ["A", "B", "C", "D", "E", "F"]
+        ["F", "E", "D", "C", "B", "A"]
     ]
     stxState2 = [
-        ["F", "E", "D", "C", "B", "A"],
+        ["A", "B", "C", "D", "E", "F"],
         []
     ]
     stxState3 = [
-        ["C", "B", "A"],
-        ["D", "E", "F"]
+        ["A", "B", "C"],
+        ["F", "E", "D"]
     ]
     executeInstruction(stx, 3, 1, 2) # move 3 from 1 to 2
     assert(stx == stxState1)
@@ -130,7 +231,57 @@ def testExecuteInstruction():
     executeInstruction(stx, 3, 1, 2) # move 3 from 1 to 2
     assert(stx == stxState3)
 
+    # the CrateMover 9001 keeps the moved crates in order
+    stx = [
+        ["A", "B", "C"],
+        ["F", "E", "D"]
+    ]
+    executeInstruction(stx, 2, 1, 2, reverse=False) # move 2 from 1 to 2
+    assert(stx == [["A"], ["F", "E", "D", "B", "C"]])
+    executeInstruction(stx, 5, 2, 1, reverse=False) # move 5 from 2 to 1
+    assert(stx == [["A", "F", "E", "D", "B", "C"], []])
+
+def testGetTopsByTracingBack():
+    # example from the puzzle description
+    stx = [
+        ["Z", "N"],
+        ["M", "C", "D"],
+        ["P"]
+    ]
+    instructions = [(1, 2, 1), (3, 1, 3), (2, 2, 1), (1, 1, 2)]
+    assert(getTopsByTracingBack(stx, instructions, reverse=True) == "CMZ")
+    assert(getTopsByTracingBack(stx, instructions, reverse=False) == "MCD")
+    assert(getTopsByTracingBack(stx, [(2, 1, 1)], reverse=True) == "ZDP")
+    assert(getTopsByTracingBack(stx, [(2, 1, 2)], reverse=False) == " NP")
+    for reverse in (True, False):
+        stxCopy = [list(stk) for stk in stx]
+        executeInstruction(stxCopy, 2, 1, 1, reverse)
+        assert(''.join(stk[-1] for stk in stxCopy) == getTopsByTracingBack(stx, [(2, 1, 1)], reverse))
+
+    for reverse in (True, False):
+        with open("5_input.txt", "r") as f:
+            stx = readStacks(f)
+            instructions = readInstructions(f)
+        assert(getTopsByTracingBack(stx, instructions, reverse) == runProgram(reverse))
+
+def testReadProgram():
+    with open("5_input.txt", "r") as f:
+        expected_stx = readStacks(f)
+        expected_instructions = readInstructions(f)
+    stx, program = readProgram()
+    assert(stx == expected_stx)
+    assert(len(program) == 3 * len(expected_instructions))
+    assert(program[0:6].tolist() == [3, 8, 9, 2, 2, 8])
+    for reverse in (True, False):
+        moved = [list(stk) for stk in stx]
+        executeProgram(moved, program, reverse)
+        assert(''.join(stk[-1] for stk in moved) == runProgram(reverse))
+    assert(stx == expected_stx) # running on copies leaves the parsed stacks untouched
+    assert(parseDrawing(b"    [D]    \n[N] [C]    \n[Z] [M] [P]\n 1   2   3 ") == [["Z", "N"], ["M", "C", "D"], ["P"]])
+
 testReadStacks()
 testParseInstruction()
-#testExecuteInstruction()
+testExecuteInstruction()
+testGetTopsByTracingBack()
+testReadProgram()
 main()
\ No newline at end of file
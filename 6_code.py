@@ -1,75 +1,217 @@
+import asyncio
+
 class Buf:
     """
     Maintain the following:
-    - a "sliding window" of characters read from the buffer
-    - a histogram of the characters currently in the window
-    - a "uniqueness" condition which will be TRUE if all characters in the buffer are different from each other
-    - a count of characters read up to the most recent one
+    - a "sliding window" over the last {window_size} bytes read from the buffer (just the index of its right edge)
+    - a count of each byte value currently in the window
+    - the number of distinct byte values in the window; all bytes in the window are different when it equals window_size
+    - the index of the most recently read byte
     """
     def __init__(self, buf_str, window_size):
-        self.buf_str = buf_str                              # the entire buffer string
+        self.buf = buf_str.encode() if isinstance(buf_str, str) else buf_str # the entire buffer, as bytes
         self.window_size = window_size                      # the length of the sliding window
-        self.read_idx = 3                                   # the index of the most recently read character in the buffer string
-        self.last_char_idx = len(buf_str) - 1               # the index of the last character in the buffer string
-        self.window = list(buf_str[0:window_size])          # a sliding window of the {window_size} most recently read characters
-        self.hist = dict()                                  # a histogram view of the sliding window
-        for i in self.window:
-            if i not in self.hist:
-                self.hist[i] = 1
-            else:
-                self.hist[i] += 1
+        self.read_idx = window_size - 1                     # the index of the most recently read byte in the buffer
+        self.last_char_idx = len(self.buf) - 1              # the index of the last byte in the buffer
+        self.counts = [0] * 256                             # how many times each byte value occurs in the window
+        self.distinct = 0                                   # how many byte values have a non-zero count
+        for b in self.buf[0:window_size]:
+            self.counts[b] += 1
+            if self.counts[b] == 1:
+                self.distinct += 1
 
     def next(self) -> bool:
         """
-        Sliding window moves to the right, and we update the histogram to reflect the current state of the window.
-        Return False if we've hit the end of the buffer string, else True.
+        Sliding window moves to the right, and we update the counts to reflect the current state of the window.
+        Return False if we've hit the end of the buffer, else True.
 
         Invariants:
-        - len(window) == window_size
-        - len(hist) <= window_size
-        - sum(hist.values() == window_size)
-        - read_count <= len(buf_str)
+        - sum(counts) == window_size (once the buffer holds at least window_size bytes)
+        - distinct == number of non-zero counts <= window_size
+        - read_idx <= last_char_idx
         """
         if self.read_idx >= self.last_char_idx:
             return False
 
         self.read_idx += 1
 
-        # move sliding window to the right by adding a new character to the right side of the list and ejecting the left-most
-        next_char = self.buf_str[self.read_idx]
-        self.window.append(next_char)
-        ejected_char = self.window.pop(0)
-
-        # add an occurence of the new character to the histogram
-        if next_char not in self.hist:
-                self.hist[next_char] = 1
-        else:
-            self.hist[next_char] += 1
+        # add an occurrence of the new byte on the right side of the window
+        next_char = self.buf[self.read_idx]
+        self.counts[next_char] += 1
+        if self.counts[next_char] == 1:
+            self.distinct += 1
 
-        # remove an occurrence of the ejected character from the histogram
-        self.hist[ejected_char] -= 1
-        if self.hist[ejected_char] == 0:
-            self.hist.pop(ejected_char)
+        # remove an occurrence of the byte that just left the left side of the window
+        ejected_char = self.buf[self.read_idx - self.window_size]
+        self.counts[ejected_char] -= 1
+        if self.counts[ejected_char] == 0:
+            self.distinct -= 1
 
         return True
 
     def isPacketStartFound(self) -> bool:
-        return len(self.hist) == self.window_size
+        return self.distinct == self.window_size
 
     def getPacketStart(self) -> int:
         return self.read_idx + 1
 
-def parts1and2():
-    buf = None
-    with open("6_input.txt", "r") as f:
-        # buf = Buf(f.readline(), 4) # part 1
-        buf = Buf(f.readline(), 14) # part 2
-    if buf is not None:
-        while not buf.isPacketStartFound() and buf.next():
-                continue
-        if buf.isPacketStartFound():
-            print(buf.getPacketStart())
+def findMarker(buf, window_size: int) -> int:
+    """
+    Skip-ahead version of the Buf scan. Return the number of bytes read up to the end of the first window of
+    {window_size} distinct bytes, or -1 if there is none.
+
+    The window is [start, i]. When byte i was last seen inside the window, no window containing both copies can
+    be a marker, so start jumps straight past the earlier copy.
+    """
+    if isinstance(buf, str):
+        buf = buf.encode()
+    last_seen = [-1] * 256
+    start = 0
+    for i, b in enumerate(buf):
+        if last_seen[b] >= start:
+            start = last_seen[b] + 1
+        last_seen[b] = i
+        if i - start + 1 == window_size:
+            return i + 1
+    return -1
+
+def findMarkers(buf, window_sizes=(4, 14)) -> dict[int, int]:
+    """
+    Run findMarker() for several window sizes in a single pass.
+
+    The last-seen positions and the start of the current run of distinct bytes don't depend on the window size:
+    a window of any size N ending at byte i is a marker exactly when the run [start, i] is at least N long.
+    So one scan serves every size, and it stops as soon as the largest size has been found.
+    Sizes without a marker map to -1.
+    """
+    if isinstance(buf, str):
+        buf = buf.encode()
+    pending = sorted(set(window_sizes)) # sizes not found yet, smallest first
+    markers = {window_size: -1 for window_size in pending}
+    last_seen = [-1] * 256
+    start = 0
+    for i, b in enumerate(buf):
+        if last_seen[b] >= start:
+            start = last_seen[b] + 1
+        last_seen[b] = i
+        run_length = i - start + 1
+        while pending and run_length >= pending[0]: # any size up to the run length ends its first marker here
+            markers[pending.pop(0)] = i + 1
+        if not pending:
+            break
+    return markers
+
+class MarkerStream:
+    """
+    Incremental version of findMarker() for signals that arrive in chunks and may never end.
+
+    Only the last position of each byte value, the start of the current run of distinct bytes, and the number of
+    bytes fed so far are kept between chunks, so a marker that straddles two chunks is still found.
+    Every offset where the last {window_size} bytes are all different is reported, not just the first one.
+    Offsets use the same convention as Buf.getPacketStart(): the number of bytes read up to the end of the marker.
+    """
+    def __init__(self, window_size: int):
+        self.window_size = window_size
+        self.last_seen = [-1] * 256     # absolute offset of the last occurrence of each byte value
+        self.start = 0                  # absolute offset of the first byte of the current run of distinct bytes
+        self.offset = 0                 # number of bytes fed so far
+
+    def feed(self, chunk: bytes) -> list[int]:
+        markers = []
+        last_seen = self.last_seen
+        start = self.start
+        offset = self.offset
+        for b in chunk:
+            if last_seen[b] >= start:
+                start = last_seen[b] + 1
+            last_seen[b] = offset
+            offset += 1
+            if offset - start >= self.window_size:
+                markers.append(offset)
+        self.start = start
+        self.offset = offset
+        return markers
+
+def scanChunks(chunks, window_sizes=(4, 14)):
+    # yield (window_size, offset) for every marker of every window size, in the order the chunks arrive
+    streams = [MarkerStream(window_size) for window_size in window_sizes]
+    for chunk in chunks:
+        for stream in streams:
+            for offset in stream.feed(chunk):
+                yield stream.window_size, offset
+
+async def scanStream(reader, window_sizes=(4, 14), chunk_size: int = 1 << 16):
+    # asyncio variant of scanChunks() that pulls chunks from an asyncio.StreamReader until EOF
+    streams = [MarkerStream(window_size) for window_size in window_sizes]
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            return
+        for stream in streams:
+            for offset in stream.feed(chunk):
+                yield stream.window_size, offset
+
+def parts1and2(window_sizes=(4, 14)): # part 1 looks for a 4-byte packet marker, part 2 for a 14-byte message marker
+    with open("6_input.txt", "rb") as f:
+        markers = findMarkers(f.readline().strip(), window_sizes)
+    for window_size, marker in markers.items():
+        if marker != -1:
+            print(marker)
         else:
-            print("Packet start not found.")
+            print(f"Marker of size {window_size} not found.")
+
+def testMarkers():
+    examples = [
+        ("mjqjpqmgbljsphdztnvjfqwrcgsmlb", 7, 19),
+        ("bvwbjplbgvbhsrlpgdmjqwftvncz", 5, 23),
+        ("nznrnfrfntjfmvfwmzdfjlvtqnbhcprsg", 10, 29),
+        ("zcfzfwzzqfrljwzlrfnpqdbhtmscgvjw", 11, 26)
+    ]
+    for signal, packet_start, message_start in examples:
+        for window_size, expected in ((4, packet_start), (14, message_start)):
+            buf = Buf(signal, window_size)
+            while not buf.isPacketStartFound() and buf.next():
+                continue
+            assert(buf.isPacketStartFound() and buf.getPacketStart() == expected)
+            assert(findMarker(signal, window_size) == expected)
+    for window_size, expected in ((1, 1), (2, 3)):
+        buf = Buf("aab", window_size)
+        while not buf.isPacketStartFound() and buf.next():
+            continue
+        assert(buf.getPacketStart() == expected and findMarker("aab", window_size) == expected)
+    assert(findMarker("aab", 3) == -1)
+    for signal, packet_start, message_start in examples:
+        assert(findMarkers(signal) == {4: packet_start, 14: message_start})
+        assert(findMarkers(signal, (1, 2, 3, 5, 20)) == {size: findMarker(signal, size) for size in (1, 2, 3, 5, 20)})
+    assert(findMarkers("aab", (3, 2, 1)) == {1: 1, 2: 3, 3: -1})
+    assert(not Buf("ab", 3).isPacketStartFound())
+
+def testMarkerStream():
+    signal = b"mjqjpqmgbljsphdztnvjfqwrcgsmlb"
+    for window_size in (4, 14):
+        expected = [i for i in range(window_size, len(signal) + 1) if len(set(signal[i - window_size:i])) == window_size]
+        assert(expected[0] == findMarker(signal, window_size))
+        for chunk_size in (1, 3, 7, len(signal)):
+            stream = MarkerStream(window_size)
+            found = []
+            for i in range(0, len(signal), chunk_size):
+                found += stream.feed(signal[i:i + chunk_size])
+            assert(found == expected)
+
+    chunks = [signal[i:i + 5] for i in range(0, len(signal), 5)]
+    found = list(scanChunks(chunks))
+    assert([offset for window_size, offset in found if window_size == 4][0] == 7)
+    assert([offset for window_size, offset in found if window_size == 14][0] == 19)
+
+    async def collect():
+        reader = asyncio.StreamReader()
+        for chunk in chunks:
+            reader.feed_data(chunk)
+        reader.feed_eof()
+        return [marker async for marker in scanStream(reader, chunk_size=4)]
+    async_found = asyncio.run(collect())
+    assert(sorted(async_found) == sorted(found))
 
+testMarkers()
+testMarkerStream()
 parts1and2()
\ No newline at end of file
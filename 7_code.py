@@ -7,6 +7,13 @@ output regular expressions:
 file: ^([\d]+) (.+)$
 directory: ^dir [a-zA-Z]+$
 """
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+
+TOTAL_DISK_SPACE = 70000000
+SPACE_NEEDED = 30000000
+SMALL_DIR_LIMIT = 100000
 
 class Dir:
     pass
@@ -32,8 +39,10 @@ class Node:
 
 class Dir(Node):
     def __init__(self, name: str, parentDir: Dir):
-        super().__init__(name, parentDir)
+        # set up our own state before Node.__init__ registers us with the parent, which reads our size
         self.children: dict[(str, Dir)] = {}
+        self.size = 0 # total size of everything below this directory, kept up to date by addChild()
+        super().__init__(name, parentDir)
     
     def __repr__(self):
         return str(self)
@@ -42,59 +51,85 @@ class Dir(Node):
         return f"dir {self.name}"
     
     def addChild(self, child: Node):
+        """
+        Attach a child and add its size to this directory and every directory above it.
+        Adding the same child twice is a no-op (Node.__init__ already registers every new node with its parent).
+        A directory that is listed again keeps its existing node and contents, and the new node is ignored.
+        A file that is listed again is replaced by the new node, which only applies the difference in size.
+        """
+        existing = self.children.get(child.getName())
+        if existing is child or (existing and existing.isDir()):
+            return
         self.children[child.getName()] = child
+        delta = child.getSize() - (existing.getSize() if existing else 0)
+        d = self
+        while d:
+            d.size += delta
+            d = d.getParent()
     
     def getChild(self, childName: str) -> str:
         return self.children[childName]
     
     def getSize(self):
-        return sum([child.getSize() for child in self.children.values()])
+        return self.size
     
     def isDir(self):
         return True
     
-    def getSizePart1(self) -> int:
+    def getDirs(self):
+        # every directory in the tree, starting with this one, in Breadth First order
+        toVisit = deque([self])
+        while len(toVisit) != 0:
+            currentNode = toVisit.popleft()
+            toVisit.extend(filter(lambda n: n.isDir(), currentNode.children.values()))
+            yield currentNode
+
+    def getSizePart1(self, limit: int = SMALL_DIR_LIMIT) -> int:
         """
-        We need to traverse the directory tree and find all directories whose size is less than or equal to 100,000.
+        We need to traverse the directory tree and find all directories whose size is less than or equal to {limit}.
         
-        We can do this via Breadth First Search. As we visit each directory, we will calculate its size and add it 
-        to a list if it does not exceed 100,000.
+        We can do this via Breadth First Search. As we visit each directory, we will look up its size and add it 
+        to a running total if it does not exceed {limit}.
         """
         runningTotal = 0
-        toVisit = [self]
-        while len(toVisit) != 0:
-            currentNode = toVisit.pop(0)
-            toVisit += filter(lambda n: n.isDir(), currentNode.children.values())
+        for currentNode in self.getDirs():
             size = currentNode.getSize()
-            if size <= 100000:
+            if size <= limit:
                 runningTotal += size
         return runningTotal
     
-    def getSizePart2(self) -> int:
-        totalDiskSpace = 70000000
-        spaceNeeded = 30000000
+    def getSizePart2(self, totalDiskSpace: int = TOTAL_DISK_SPACE, spaceNeeded: int = SPACE_NEEDED) -> int:
         maxUsedSpace = totalDiskSpace - spaceNeeded
         sizeRootDir = self.getSize()
         excess = sizeRootDir - maxUsedSpace
         if excess > 0:
-            deletionCandidates = []
-            toVisit = [self]
-            while len(toVisit) != 0:
-                currentNode = toVisit.pop(0)
-                toVisit += filter(lambda n: n.isDir(), currentNode.children.values())
-                size = currentNode.getSize()
-                if size >= excess:
-                    deletionCandidates.append(size)
-            deletionCandidates.sort()
-            return deletionCandidates[0]
+            # the root itself is always big enough, so there's at least one candidate
+            return min(d.getSize() for d in self.getDirs() if d.getSize() >= excess)
         else:
             return 0
 
+    def getSizeParts1and2(self) -> tuple[int, int]:
+        # Sizes are cached, so a single walk over the directories answers both parts
+        maxUsedSpace = TOTAL_DISK_SPACE - SPACE_NEEDED
+        excess = self.getSize() - maxUsedSpace
+        part1 = 0
+        part2 = self.getSize() if excess > 0 else 0
+        toVisit = [self]
+        while len(toVisit) != 0:
+            currentNode = toVisit.pop()
+            toVisit += filter(lambda n: n.isDir(), currentNode.children.values())
+            size = currentNode.getSize()
+            if size <= SMALL_DIR_LIMIT:
+                part1 += size
+            if excess > 0 and excess <= size < part2:
+                part2 = size
+        return part1, part2
+
 
 class File(Node):
     def __init__(self, name: str, parentDir: Dir, size: int):
+        self.size = size # set before Node.__init__ registers us with the parent, which reads our size
         super().__init__(name, parentDir)
-        self.size = size
     
     def __repr__(self):
         return str(self)
@@ -105,6 +140,273 @@ class File(Node):
     def getSize(self):
         return self.size
 
+class CompactTree:
+    """
+    Array-backed store of the whole filesystem tree, for keeping a huge transcript around without a Python object
+    (and a children dict) per entry. Node i is described by slot i of parallel arrays:
+    - parent: index of the parent directory (-1 for the root)
+    - size: file size, or total size for a directory
+    - nameStart/nameLen: where the name sits in one shared buffer, in which every distinct name is stored only once
+    - firstChild/childCount: a directory's children are the consecutive indices [firstChild, firstChild + childCount)
+    - dirFlags: 1 for a directory, 0 for a file
+
+    Nodes are numbered in the order they're listed, so every "ls" block becomes one consecutive range of children,
+    and every node comes after its parent.
+    """
+    def __init__(self):
+        self.parent = array('i')
+        self.size = array('q')
+        self.nameStart = array('I')
+        self.nameLen = array('I')
+        self.firstChild = array('i')
+        self.childCount = array('i')
+        self.dirFlags = bytearray()
+        self.names = bytearray()
+
+    def addNode(self, name: str, parentIdx: int, size: int, isDir: bool, nameOffsets: dict) -> int:
+        encoded = name.encode()
+        if encoded not in nameOffsets:
+            nameOffsets[encoded] = len(self.names)
+            self.names += encoded
+        self.parent.append(parentIdx)
+        self.size.append(size)
+        self.nameStart.append(nameOffsets[encoded])
+        self.nameLen.append(len(encoded))
+        self.firstChild.append(0)
+        self.childCount.append(0)
+        self.dirFlags.append(1 if isDir else 0)
+        return len(self.parent) - 1
+
+    @staticmethod
+    def fromTranscript(lines):
+        tree = CompactTree()
+        # only needed while building
+        nameOffsets = {}
+        childIndex = {}     # (parent index, name) -> child index, so "cd" doesn't scan the parent's children
+        listed = set()      # directories whose "ls" output we've already added
+        root = tree.addNode("root", -1, 0, True, nameOffsets)
+        cwd = root
+        skipping = False    # True while reading the output of a repeated "ls", which adds nothing new
+        for line in lines:
+            tokens = line.split()
+            if len(tokens) == 0:
+                break
+            if tokens[0] == '$':
+                skipping = False
+                if tokens[1] == 'cd':
+                    if tokens[2] == '/':
+                        cwd = root
+                    elif tokens[2] == '..':
+                        cwd = tree.getParent(cwd)
+                    else:
+                        cwd = childIndex[(cwd, tokens[2])]
+                elif cwd in listed: # list command ("$ ls") for a directory we already have
+                    skipping = True
+                else: # list command ("$ ls"): the entries that follow are cwd's children
+                    listed.add(cwd)
+                    tree.firstChild[cwd] = len(tree.parent)
+                    tree.childCount[cwd] = 0
+            elif skipping:
+                continue
+            elif tokens[0] == 'dir':
+                childIndex[(cwd, tokens[1])] = tree.addNode(tokens[1], cwd, 0, True, nameOffsets)
+                tree.childCount[cwd] += 1
+            else: # file (ex: "216592 pcg.wnr")
+                childIndex[(cwd, tokens[1])] = tree.addNode(tokens[1], cwd, int(tokens[0]), False, nameOffsets)
+                tree.childCount[cwd] += 1
+        # children always come after their parent, so one backwards pass rolls every size up into the directories
+        for i in range(len(tree.parent) - 1, 0, -1):
+            tree.size[tree.parent[i]] += tree.size[i]
+        return tree
+
+    def getSize(self, idx: int) -> int:
+        return self.size[idx]
+
+    def getParent(self, idx: int) -> int:
+        return self.parent[idx]
+
+    def getName(self, idx: int) -> str:
+        start = self.nameStart[idx]
+        return self.names[start:start + self.nameLen[idx]].decode()
+
+    def isDir(self, idx: int) -> bool:
+        return self.dirFlags[idx] == 1
+
+    def getChildren(self, idx: int) -> range:
+        return range(self.firstChild[idx], self.firstChild[idx] + self.childCount[idx])
+
+    def getChild(self, idx: int, childName: str) -> int:
+        encoded = childName.encode()
+        for child in self.getChildren(idx):
+            start = self.nameStart[child]
+            if self.nameLen[child] == len(encoded) and self.names[start:start + len(encoded)] == encoded:
+                return child
+        raise KeyError(childName)
+
+    def getNode(self, idx: int = 0):
+        return CompactNode(self, idx)
+
+    def getSizeParts1and2(self) -> tuple[int, int]:
+        excess = self.size[0] - (TOTAL_DISK_SPACE - SPACE_NEEDED)
+        part1 = 0
+        part2 = self.size[0] if excess > 0 else 0
+        for idx, flag in enumerate(self.dirFlags):
+            if flag:
+                size = self.size[idx]
+                if size <= SMALL_DIR_LIMIT:
+                    part1 += size
+                if excess > 0 and excess <= size < part2:
+                    part2 = size
+        return part1, part2
+
+class CompactNode:
+    """
+    Lightweight handle onto one entry of a CompactTree, with the same navigation methods as Dir and File.
+    Handles are created on demand and hold nothing but the tree and the index.
+    """
+    __slots__ = ("tree", "idx")
+
+    def __init__(self, tree: CompactTree, idx: int):
+        self.tree = tree
+        self.idx = idx
+
+    def __repr__(self):
+        return str(self)
+
+    def __str__(self):
+        return f"dir {self.getName()}" if self.isDir() else f"{self.getSize()} {self.getName()}"
+
+    def getSize(self):
+        return self.tree.getSize(self.idx)
+
+    def getParent(self):
+        parentIdx = self.tree.getParent(self.idx)
+        return CompactNode(self.tree, parentIdx) if parentIdx != -1 else None
+
+    def getName(self):
+        return self.tree.getName(self.idx)
+
+    def isDir(self):
+        return self.tree.isDir(self.idx)
+
+    def getChild(self, childName: str):
+        return CompactNode(self.tree, self.tree.getChild(self.idx, childName))
+
+class DiskUsageIndex:
+    """
+    Directories sorted by size, so that many what-if queries can be run against one ingested transcript.
+    Entries are (size, dir) pairs where dir is whatever the tree it was built from uses for a directory
+    (a Dir, or an index into a CompactTree). Building costs O(n log n); every query is a bisect plus the output.
+    """
+    def __init__(self, entries):
+        entries = sorted(entries, key=lambda e: e[0])
+        self.sizes = [size for size, _ in entries]
+        self.dirs = [d for _, d in entries]
+        self.prefixSums = [0]   # prefixSums[i] is the total size of the i smallest directories
+        for size in self.sizes:
+            self.prefixSums.append(self.prefixSums[-1] + size)
+
+    @staticmethod
+    def fromDir(root: Dir):
+        return DiskUsageIndex((d.getSize(), d) for d in root.getDirs())
+
+    @staticmethod
+    def fromCompactTree(tree: CompactTree):
+        return DiskUsageIndex((tree.getSize(idx), idx) for idx, flag in enumerate(tree.dirFlags) if flag)
+
+    def smallestAtLeast(self, minSize: int):
+        # the smallest directory whose size is >= minSize, as (size, dir), or None if there is none
+        i = bisect_left(self.sizes, minSize)
+        return (self.sizes[i], self.dirs[i]) if i < len(self.sizes) else None
+
+    def atMost(self, maxSize: int) -> list:
+        # every directory whose size is <= maxSize, as (size, dir) pairs from smallest to largest
+        i = bisect_right(self.sizes, maxSize)
+        return list(zip(self.sizes[:i], self.dirs[:i]))
+
+    def totalAtMost(self, maxSize: int) -> int:
+        # total size of every directory whose size is <= maxSize (part 1), without listing them
+        return self.prefixSums[bisect_right(self.sizes, maxSize)]
+
+    def largest(self, k: int) -> list:
+        # the k largest directories, as (size, dir) pairs from largest to smallest
+        start = max(len(self.sizes) - k, 0)
+        return list(zip(reversed(self.sizes[start:]), reversed(self.dirs[start:])))
+
+    def deletionCandidate(self, totalDiskSpace: int = TOTAL_DISK_SPACE, spaceNeeded: int = SPACE_NEEDED):
+        """
+        The smallest directory that frees up enough space (part 2), as (size, dir).
+        The root is the largest directory, so its size is the disk usage. Returns None if nothing needs deleting,
+        or if even deleting the largest directory isn't enough.
+        """
+        if len(self.sizes) == 0:
+            return None
+        excess = self.sizes[-1] - (totalDiskSpace - spaceNeeded)
+        if excess <= 0:
+            return None
+        return self.smallestAtLeast(excess)
+
+def walkDirSizes(lines):
+    """
+    Yield the total size of every directory in the transcript without building any Node objects.
+
+    Only the running sizes of the directories on the current cd path are kept, on a stack. When a directory is left
+    (on "cd ..", "cd /", or at the end of the transcript) its size is final, so we yield it and add it to its parent.
+    The root comes out last. Memory is O(depth) instead of O(entries).
+    Unlike the Dir tree, a directory that is listed twice will have its files counted twice.
+    """
+    stack = []
+    for line in lines:
+        tokens = line.split()
+        if len(tokens) == 0:
+            break
+        if tokens[0] == '$':
+            if tokens[1] == 'cd':
+                if tokens[2] == '/':
+                    while len(stack) > 1:
+                        size = stack.pop()
+                        yield size
+                        stack[-1] += size
+                    if len(stack) == 0:
+                        stack.append(0)
+                elif tokens[2] == '..':
+                    size = stack.pop()
+                    yield size
+                    stack[-1] += size
+                else:
+                    stack.append(0)
+        elif tokens[0] != 'dir': # file (ex: "216592 pcg.wnr")
+            stack[-1] += int(tokens[0])
+    while len(stack) != 0:
+        size = stack.pop()
+        yield size
+        if len(stack) != 0:
+            stack[-1] += size
+
+def streamSizeParts1and2(path: str = "7_input.txt") -> tuple[int, int]:
+    """
+    Part 2 needs the root size before it can pick a candidate, so the transcript is read twice:
+    once to add up every file (which is the root size), then once through walkDirSizes() to reduce both parts.
+    """
+    with open(path, "r") as f:
+        rootSize = 0
+        for line in f:
+            tokens = line.split()
+            if len(tokens) == 0:
+                break
+            if tokens[0] != '$' and tokens[0] != 'dir':
+                rootSize += int(tokens[0])
+    excess = rootSize - (TOTAL_DISK_SPACE - SPACE_NEEDED)
+    part1 = 0
+    part2 = rootSize if excess > 0 else 0
+    with open(path, "r") as f:
+        for size in walkDirSizes(f):
+            if size <= SMALL_DIR_LIMIT:
+                part1 += size
+            if excess > 0 and excess <= size < part2:
+                part2 = size
+    return part1, part2
+
 def testGetSize():
     rootDir = Dir("/", None)
     subDir = Dir("sub", rootDir)
@@ -113,8 +415,114 @@ def testGetSize():
     File("readme.txt", rootDir, 7)
     assert(rootDir.getSize() == 18)
 
+def testIncrementalSize():
+    rootDir = Dir("/", None)
+    subDir = Dir("sub", rootDir)
+    rootDir.addChild(subDir) # already registered by Node.__init__, must not count twice
+    deepDir = Dir("deep", subDir)
+    f = File("a.txt", deepDir, 10)
+    deepDir.addChild(f)
+    assert((rootDir.getSize(), subDir.getSize(), deepDir.getSize()) == (10, 10, 10))
+    File("a.txt", deepDir, 4) # same name listed again with a new size
+    assert((rootDir.getSize(), subDir.getSize(), deepDir.getSize()) == (4, 4, 4))
+    File("b.txt", rootDir, 200000)
+    assert(rootDir.getSizeParts1and2() == (8, 0))
+
+    rootDir = Dir("/", None)
+    subDir = Dir("sub", rootDir)
+    File("a.txt", subDir, 5)
+    rootDir.addChild(Dir("sub", rootDir)) # "ls" of / repeated after sub was filled in
+    assert(rootDir.getChild("sub") is subDir)
+    assert((rootDir.getSize(), subDir.getSize()) == (5, 5))
+
+def testWalkDirSizes():
+    transcript = [
+        "$ cd /", "$ ls", "dir a", "14848514 b.txt", "8504156 c.dat", "dir d",
+        "$ cd a", "$ ls", "dir e", "29116 f", "2557 g", "62596 h.lst",
+        "$ cd e", "$ ls", "584 i",
+        "$ cd ..", "$ cd ..",
+        "$ cd d", "$ ls", "4060174 j", "8033020 d.log", "5626152 d.ext", "7214296 k"
+    ]
+    assert(list(walkDirSizes(transcript)) == [584, 94853, 24933642, 48381165])
+    assert(list(walkDirSizes(transcript[0:13] + ["$ cd /"] + transcript[17:])) == [0, 94269, 24933642, 48380581])
+    assert(streamSizeParts1and2() == (1543140, 1117448))
+
+def testCompactTree():
+    transcript = [
+        "$ cd /", "$ ls", "dir a", "14848514 b.txt", "8504156 c.dat", "dir d",
+        "$ cd a", "$ ls", "dir e", "29116 f", "2557 g", "62596 h.lst",
+        "$ cd e", "$ ls", "584 i",
+        "$ cd ..", "$ cd ..",
+        "$ cd d", "$ ls", "4060174 j", "8033020 d.log", "5626152 d.ext", "7214296 k"
+    ]
+    tree = CompactTree.fromTranscript(transcript)
+    root = tree.getNode()
+    assert(root.getSize() == 48381165 and root.getParent() is None)
+    e = root.getChild("a").getChild("e")
+    assert(e.isDir() and e.getSize() == 584)
+    assert(e.getParent().getName() == "a" and e.getParent().getParent().getName() == "root")
+    assert(str(root.getChild("d").getChild("k")) == "7214296 k")
+    assert(sorted(tree.getName(c) for c in tree.getChildren(0)) == ["a", "b.txt", "c.dat", "d"])
+    assert(tree.getSizeParts1and2() == (95437, 24933642))
+
+    # the same name in two directories is only stored once
+    tree = CompactTree.fromTranscript(["$ cd /", "$ ls", "dir x", "1 n.txt", "$ cd x", "$ ls", "2 n.txt"])
+    first, second = tree.getNode().getChild("n.txt"), tree.getNode().getChild("x").getChild("n.txt")
+    assert(tree.nameStart[first.idx] == tree.nameStart[second.idx] and tree.names.count(b"n.txt") == 1)
+    assert(tree.getSize(0) == 3)
+
+    # listing a directory again doesn't add its entries twice
+    tree = CompactTree.fromTranscript(["$ cd /", "$ ls", "dir a", "5 x", "$ cd a", "$ ls", "7 y", "$ cd ..", "$ ls", "dir a", "5 x"])
+    assert(tree.getSize(0) == 12 and len(tree.getChildren(0)) == 2)
+    assert(tree.getNode().getChild("a").getChild("y").getSize() == 7)
+
+    # a directory with many subdirectories doesn't make "cd" slow
+    transcript = ["$ cd /", "$ ls"] + [f"dir d{i}" for i in range(20000)]
+    for i in range(20000):
+        transcript += [f"$ cd d{i}", "$ ls", "1 f", "$ cd .."]
+    assert(CompactTree.fromTranscript(transcript).getSize(0) == 20000)
+
+    with open("7_input.txt", "r") as f:
+        assert(CompactTree.fromTranscript(f).getSizeParts1and2() == streamSizeParts1and2())
+
+def testDiskUsageIndex():
+    rootDir = Dir("/", None)
+    a = Dir("a", rootDir)
+    e = Dir("e", a)
+    d = Dir("d", rootDir)
+    File("b.txt", rootDir, 14848514)
+    File("c.dat", rootDir, 8504156)
+    File("f", a, 29116)
+    File("g", a, 2557)
+    File("h.lst", a, 62596)
+    File("i", e, 584)
+    for name, size in (("j", 4060174), ("d.log", 8033020), ("d.ext", 5626152), ("k", 7214296)):
+        File(name, d, size)
+    assert(rootDir.getSizePart1() == 95437 and rootDir.getSizePart1(limit=1000) == 584)
+    assert(rootDir.getSizePart2() == 24933642 and rootDir.getSizePart2(totalDiskSpace=100000000) == 0)
+    assert(rootDir.getSizePart2(spaceNeeded=21668835) == 94853) # 50,000 over the limit
+
+    index = DiskUsageIndex.fromDir(rootDir)
+    assert(index.totalAtMost(100000) == 95437)
+    assert(index.atMost(100000) == [(584, e), (94853, a)])
+    assert(index.smallestAtLeast(600) == (94853, a))
+    assert(index.smallestAtLeast(50000000) is None)
+    assert(index.largest(2) == [(48381165, rootDir), (24933642, d)])
+    assert(len(index.largest(10)) == 4)
+    assert(index.deletionCandidate() == (24933642, d))
+    assert(index.deletionCandidate(totalDiskSpace=100000000) is None)
+
+    with open("7_input.txt", "r") as f:
+        tree = CompactTree.fromTranscript(f)
+    index = DiskUsageIndex.fromCompactTree(tree)
+    assert((index.totalAtMost(SMALL_DIR_LIMIT), index.deletionCandidate()[0]) == tree.getSizeParts1and2())
+
 def runTests():
     testGetSize()
+    testIncrementalSize()
+    testWalkDirSizes()
+    testCompactTree()
+    testDiskUsageIndex()
 
 def main():
     with open("7_input.txt", "r") as f:
@@ -141,7 +549,9 @@ def main():
                 cwd.addChild(File(tokens[1], cwd, int(tokens[0])))
             line = f.readline()
             line_counter += 1
-        #print(root.getSizePart1())
-        print(root.getSizePart2())
+        part1, part2 = root.getSizeParts1and2()
+        print(part1)
+        print(part2)
 
+runTests()
 main()
\ No newline at end of file
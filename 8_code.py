@@ -31,6 +31,16 @@ Once we see a tree of height 9, we can stop counting from that direction.
 
 We need to keep track of whether I've seen a tree or not, to avoid double counting them.
 """
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+try:
+    import numpy as np
+except ImportError: # only NumpyTreeGrid needs NumPy
+    np = None
+
 class Tree:
     def __init__(self, height, index):
         self.height = height
@@ -73,6 +83,7 @@ class TreeGrid:
         self.seen = set()
         self.__numRows = len(self.grid)
         self.__numCols = len(self.grid[0])
+        self.__heightIndex = None
     
     def __str__(self):
         return str(self.grid)
@@ -127,8 +138,65 @@ class TreeGrid:
         currTreeHeight = self.grid[row][col].height
         scenicScore = 1
         for d in self.DIRECTIONS:
-            scenicScore *= self.getViewingDistance(d, row, col, currTreeHeight)
+            scenicScore *= self.getIndexedViewingDistance(d, row, col, currTreeHeight)
         return scenicScore
+
+    def getHeightIndex(self):
+        """
+        For every direction, every height h from 0 to 9, and every cell: the row (UP/DOWN) or column (LEFT/RIGHT)
+        of the closest tree at least h tall in that direction from the cell, or -1 if there is none before the edge.
+        Stored as one flat array per direction, indexed by (h * numRows + row) * numCols + col.
+
+        Built on first use by sweeping each line against the direction, remembering the last position of a tree
+        at least h tall for every h, so the build is O(10 * rows * cols) and every lookup after it is O(1).
+        """
+        if self.__heightIndex is not None:
+            return self.__heightIndex
+        numRows, numCols = self.__numRows, self.__numCols
+        numCells = numRows * numCols
+        self.__heightIndex = {}
+        for d in TreeGrid.DIRECTIONS:
+            table = array('i', [-1]) * (10 * numCells)
+            if d.colStep != 0: # each row is a line, swept from the side the direction looks toward
+                cols = range(numCols) if d.colStep < 0 else range(numCols - 1, -1, -1)
+                lines = ([(i, j) for j in cols] for i in range(numRows))
+            else: # each column is a line
+                rows = range(numRows) if d.rowStep < 0 else range(numRows - 1, -1, -1)
+                lines = ([(i, j) for i in rows] for j in range(numCols))
+            for line in lines:
+                lastAtLeast = [-1] * 10 # lastAtLeast[h]: position of the last tree seen that is at least h tall
+                for i, j in line:
+                    cell = i * numCols + j
+                    for h in range(10):
+                        table[h * numCells + cell] = lastAtLeast[h]
+                    pos = j if d.colStep != 0 else i
+                    for h in range(self.grid[i][j].height + 1):
+                        lastAtLeast[h] = pos
+            self.__heightIndex[d.name] = table
+        return self.__heightIndex
+
+    def getBlocker(self, direction, row, col, height):
+        # position of the closest tree at least {height} tall looking in {direction} from (row, col), or -1
+        if height > 9:
+            return -1
+        table = self.getHeightIndex()[direction.name]
+        return table[(max(height, 0) * self.__numRows + row) * self.__numCols + col]
+
+    def getIndexedViewingDistance(self, direction, row, col, currTreeHeight):
+        # same answer as getViewingDistance(), looked up in the height index instead of walking
+        blocker = self.getBlocker(direction, row, col, currTreeHeight)
+        if direction.colStep != 0:
+            pos, size, step = col, self.__numCols, direction.colStep
+        else:
+            pos, size, step = row, self.__numRows, direction.rowStep
+        if blocker != -1:
+            return abs(pos - blocker)
+        return pos if step < 0 else size - 1 - pos # the view reaches the edge
+
+    def isVisible(self, row, col):
+        # a tree is visible if nothing at least as tall stands between it and the edge in some direction
+        height = self.grid[row][col].height
+        return any(self.getBlocker(d, row, col, height) == -1 for d in TreeGrid.DIRECTIONS)
     
     def getViewingDistance(self, direction, row, col, currTreeHeight):
         i = row if direction.rowStep == 0 else row + direction.rowStep
@@ -143,15 +211,224 @@ class TreeGrid:
         return vDist
 
     def getHighestScenicScore(self):
+        return self.getTotalVisibleTreesAndHighestScenicScore()[1]
+
+    @staticmethod
+    def sweepLine(heights):
+        """
+        Viewing distance and visibility looking back toward the start of a line, for every tree in the line.
+
+        We keep a stack of the trees that could still block the view of a later tree. Those are the trees
+        that no later tree has matched in height yet, so their heights go down from the bottom of the stack to the top.
+        For each tree we pop every shorter tree (it can't block anything past this tree either), and whatever is left
+        on top is the closest tree at least as tall, which blocks the view. If nothing is left, the view reaches the edge
+        and the tree is visible from it. Every tree is pushed and popped at most once, so the whole line is O(n).
+        """
+        distances = [0] * len(heights)
+        visible = [False] * len(heights)
+        stack = []
+        for k, h in enumerate(heights):
+            while len(stack) != 0 and heights[stack[-1]] < h:
+                stack.pop()
+            if len(stack) != 0:
+                distances[k] = k - stack[-1]
+            else:
+                distances[k] = k
+                visible[k] = True
+            stack.append(k)
+        return distances, visible
+
+    def getViewingDistanceGrids(self):
+        """
+        Run sweepLine() over every row and column in both directions.
+        Returns the viewing distance grid for each direction (keyed by direction name), and a grid that is True
+        for every tree visible from at least one edge.
+        """
+        heights = [[tree.height for tree in row] for row in self.grid]
+        distances = {d.name: [[0] * self.__numCols for _ in range(self.__numRows)] for d in TreeGrid.DIRECTIONS}
+        visible = [[False] * self.__numCols for _ in range(self.__numRows)]
+        for i in range(self.__numRows):
+            line = heights[i]
+            for d, reverse in ((Direction.LEFT, False), (Direction.RIGHT, True)):
+                lineDistances, lineVisible = TreeGrid.sweepLine(line[::-1] if reverse else line)
+                for k in range(self.__numCols):
+                    j = self.__numCols - 1 - k if reverse else k
+                    distances[d.name][i][j] = lineDistances[k]
+                    visible[i][j] = visible[i][j] or lineVisible[k]
+        for j in range(self.__numCols):
+            line = [heights[i][j] for i in range(self.__numRows)]
+            for d, reverse in ((Direction.UP, False), (Direction.DOWN, True)):
+                lineDistances, lineVisible = TreeGrid.sweepLine(line[::-1] if reverse else line)
+                for k in range(self.__numRows):
+                    i = self.__numRows - 1 - k if reverse else k
+                    distances[d.name][i][j] = lineDistances[k]
+                    visible[i][j] = visible[i][j] or lineVisible[k]
+        return distances, visible
+
+    def getTotalVisibleTreesAndHighestScenicScore(self):
+        # both answers from the same four sweeps, in O(rows * cols)
+        distances, visible = self.getViewingDistanceGrids()
+        totalVisible = sum(row.count(True) for row in visible)
         maxScenicScore = 0
-        i = 0
-        while i < self.__numRows:
-            j = 0
-            while j < self.__numCols:
-                maxScenicScore = max(maxScenicScore, self.getScenicScore(i,j))
-                j += 1
-            i += 1
-        return maxScenicScore
+        for i in range(self.__numRows):
+            for j in range(self.__numCols):
+                scenicScore = 1
+                for d in TreeGrid.DIRECTIONS:
+                    scenicScore *= distances[d.name][i][j]
+                maxScenicScore = max(maxScenicScore, scenicScore)
+        return totalVisible, maxScenicScore
+
+class NumpyTreeGrid:
+    """
+    TreeGrid backend that keeps the forest as a 2-D uint8 array of heights instead of a Tree object per cell.
+
+    Every direction is handled by running the same left-to-right computation over a view of the array:
+    the array itself looks LEFT, [:, ::-1] looks RIGHT, .T looks UP and .T[:, ::-1] looks DOWN.
+    Views share memory with the grid, so no transposed or reversed copies are made.
+    """
+    VIEWS = {
+        Direction.LEFT.name:  lambda a: a,
+        Direction.RIGHT.name: lambda a: a[:, ::-1],
+        Direction.UP.name:    lambda a: a.T,
+        Direction.DOWN.name:  lambda a: a.T[:, ::-1]
+    }
+
+    def __init__(self, heights):
+        self.heights = np.asarray(heights, dtype=np.uint8)
+
+    @staticmethod
+    def fromBytes(buf: bytes):
+        # Each row is a line of digits, so the file is already a (rows, width + newline) grid of bytes
+        if b"\r" in buf:
+            buf = buf.replace(b"\r", b"")
+        buf = buf.strip()
+        width = buf.find(b"\n") if b"\n" in buf else len(buf)
+        raw = np.frombuffer(buf + b"\n", dtype=np.uint8).reshape(-1, width + 1)
+        return NumpyTreeGrid(raw[:, :width] - ord("0"))
+
+    @staticmethod
+    def fromFile(path: str):
+        with open(path, "rb") as f:
+            return NumpyTreeGrid.fromBytes(f.read())
+
+    @staticmethod
+    def visibleFromStart(view):
+        # a tree is visible from the start of its line if it's taller than every tree before it
+        visible = np.ones(view.shape, dtype=bool)
+        if view.shape[1] > 1:
+            tallestSoFar = np.maximum.accumulate(view, axis=1)
+            visible[:, 1:] = view[:, 1:] > tallestSoFar[:, :-1]
+        return visible
+
+    def getVisibleMask(self):
+        visible = np.zeros(self.heights.shape, dtype=bool)
+        for view in NumpyTreeGrid.VIEWS.values():
+            view(visible)[...] |= NumpyTreeGrid.visibleFromStart(view(self.heights))
+        return visible
+
+    def getTotalVisibleTrees(self):
+        return int(self.getVisibleMask().sum())
+
+    @staticmethod
+    def distancesToStart(view):
+        """
+        Viewing distance looking back toward the start of each line.
+        Heights only go from 0 to 9, so for each height h we find, with a running maximum over the column indices
+        of the trees that are at least h tall, the closest blocker before every position. Trees of height h then
+        read their distance from that. That's 10 vectorized passes instead of a walk per tree.
+        """
+        view = np.ascontiguousarray(view) # a uint8 copy is cheap, and row-major sweeps are much faster on it
+        distances = np.zeros(view.shape, dtype=np.int32)
+        if view.shape[1] < 2:
+            return distances
+        cols = np.arange(view.shape[1], dtype=np.int32)
+        before = view[:, :-1]   # the trees that can block the view of...
+        after = view[:, 1:]     # ...the trees one column further along
+        isHeight = np.empty(after.shape, dtype=bool)
+        isBlocker = np.empty(before.shape, dtype=bool)
+        lastBlocker = np.empty(before.shape, dtype=np.int32)
+        for h in range(10):
+            np.equal(after, h, out=isHeight)
+            if not isHeight.any():
+                continue
+            # with no blocker the view reaches the edge at column 0, which works out the same as a blocker there
+            np.greater_equal(before, h, out=isBlocker)
+            np.multiply(isBlocker, cols[:-1], out=lastBlocker)
+            np.maximum.accumulate(lastBlocker, axis=1, out=lastBlocker)
+            np.subtract(cols[1:], lastBlocker, out=lastBlocker)
+            np.copyto(distances[:, 1:], lastBlocker, where=isHeight)
+        return distances
+
+    def getScenicScores(self):
+        scores = np.ones(self.heights.shape, dtype=np.int64)
+        for view in NumpyTreeGrid.VIEWS.values():
+            view(scores)[...] *= NumpyTreeGrid.distancesToStart(view(self.heights))
+        return scores
+
+    def getHighestScenicScore(self):
+        return int(self.getScenicScores().max())
+
+    def getHighestScenicScoreParallel(self, workers: int = None, strips: int = None):
+        """
+        Same answer as getHighestScenicScore(), computed by a process pool over strips of the grid.
+
+        The heights and the scores are kept in shared memory so that workers don't copy the grid.
+        First each worker multiplies the LEFT and RIGHT distances into its strip of rows, then (once every row is done)
+        each worker multiplies the UP and DOWN distances into its strip of columns and returns the strip's maximum.
+        Strips never overlap, so workers never write to the same cells.
+        """
+        workers = workers or os.cpu_count() or 1
+        strips = strips or workers
+        numRows, numCols = self.heights.shape
+        heightsShm = shared_memory.SharedMemory(create=True, size=max(self.heights.nbytes, 1))
+        scoresShm = shared_memory.SharedMemory(create=True, size=max(self.heights.size * 8, 1))
+        try:
+            np.ndarray(self.heights.shape, dtype=np.uint8, buffer=heightsShm.buf)[...] = self.heights
+            np.ndarray(self.heights.shape, dtype=np.int64, buffer=scoresShm.buf)[...] = 1
+            shared = (heightsShm.name, scoresShm.name, self.heights.shape)
+            rowStrips = NumpyTreeGrid.splitRange(numRows, strips)
+            colStrips = NumpyTreeGrid.splitRange(numCols, strips)
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(scenicStripWorker, [(*shared, 0, start, end) for start, end in rowStrips]))
+                stripMaxima = list(pool.map(scenicStripWorker, [(*shared, 1, start, end) for start, end in colStrips]))
+            return max(stripMaxima, default=0)
+        finally:
+            heightsShm.close()
+            heightsShm.unlink()
+            scoresShm.close()
+            scoresShm.unlink()
+
+    @staticmethod
+    def splitRange(length: int, parts: int):
+        # split range(length) into at most {parts} non-empty (start, end) strips of nearly equal size
+        parts = max(min(parts, length), 1)
+        bounds = [length * p // parts for p in range(parts + 1)]
+        return [(start, end) for start, end in zip(bounds, bounds[1:]) if start < end]
+
+def scenicStripWorker(args):
+    """
+    Process pool task for NumpyTreeGrid.getHighestScenicScoreParallel().
+    axis 0: multiply the LEFT and RIGHT viewing distances into rows [start, end) of the shared scores.
+    axis 1: multiply the UP and DOWN viewing distances into columns [start, end) and return their highest score.
+    """
+    heightsName, scoresName, shape, axis, start, end = args
+    heightsShm = shared_memory.SharedMemory(name=heightsName)
+    scoresShm = shared_memory.SharedMemory(name=scoresName)
+    try:
+        heights = np.ndarray(shape, dtype=np.uint8, buffer=heightsShm.buf)
+        scores = np.ndarray(shape, dtype=np.int64, buffer=scoresShm.buf)
+        if axis == 0:
+            stripHeights, stripScores = heights[start:end], scores[start:end]
+        else:
+            stripHeights, stripScores = heights[:, start:end].T, scores[:, start:end].T
+        stripScores *= NumpyTreeGrid.distancesToStart(stripHeights)
+        stripScores[:, ::-1] *= NumpyTreeGrid.distancesToStart(stripHeights[:, ::-1])
+        highest = int(stripScores.max()) if axis == 1 else None
+        del heights, scores, stripHeights, stripScores # release the buffers before closing
+        return highest
+    finally:
+        heightsShm.close()
+        scoresShm.close()
 
 def testLinesForDirection():
     grid = [[1,2,3], [4,5,6], [7,8,9]]
@@ -199,13 +476,95 @@ def testGetHighestScenicScore():
     tg = TreeGrid(grid)
     assert(tg.getHighestScenicScore() == 8)
 
+def testGetViewingDistanceGrids():
+    grid = [
+        [3,0,3,7,3],
+        [2,5,5,1,2],
+        [6,5,3,3,2],
+        [3,3,5,4,9],
+        [3,5,3,9,0]
+    ]
+    tg = TreeGrid(grid)
+    distances, visible = tg.getViewingDistanceGrids()
+    for i in range(len(grid)):
+        for j in range(len(grid[0])):
+            for d in TreeGrid.DIRECTIONS:
+                assert(distances[d.name][i][j] == tg.getViewingDistance(d, i, j, grid[i][j]))
+    assert(sum(row.count(True) for row in visible) == 21)
+    assert(tg.getTotalVisibleTreesAndHighestScenicScore() == (21, 8))
+
+    # rectangular grids work too
+    tg = TreeGrid([[1,2,3,1], [2,0,0,2]])
+    assert(tg.getTotalVisibleTreesAndHighestScenicScore() == (8, 0))
+    assert(TreeGrid.sweepLine([3,1,2,3,0]) == ([0, 1, 2, 3, 1], [True, False, False, False, False]))
+
+def testHeightIndex():
+    grid = [
+        [3,0,3,7,3],
+        [2,5,5,1,2],
+        [6,5,3,3,2],
+        [3,3,5,4,9],
+        [3,5,3,9,0]
+    ]
+    tg = TreeGrid(grid)
+    for i in range(len(grid)):
+        for j in range(len(grid[0])):
+            for d in TreeGrid.DIRECTIONS:
+                for height in range(-1, 11):
+                    assert(tg.getIndexedViewingDistance(d, i, j, height) == tg.getViewingDistance(d, i, j, height))
+    assert(sum(tg.isVisible(i, j) for i in range(len(grid)) for j in range(len(grid[0]))) == 21)
+    assert(not tg.isVisible(1, 3) and tg.isVisible(1, 2))
+    assert(tg.getBlocker(Direction.UP, 3, 2, 5) == 1)
+    assert(tg.getBlocker(Direction.RIGHT, 0, 0, 9) == -1)
+
+    tg = TreeGrid([[1,2,3,1], [2,0,0,2]])
+    for i in range(2):
+        for j in range(4):
+            for d in TreeGrid.DIRECTIONS:
+                assert(tg.getIndexedViewingDistance(d, i, j, 1) == tg.getViewingDistance(d, i, j, 1))
+
+def testNumpyTreeGrid():
+    grid = [
+        [3,0,3,7,3],
+        [2,5,5,1,2],
+        [6,5,3,3,2],
+        [3,3,5,4,9],
+        [3,5,3,9,0]
+    ]
+    ng = NumpyTreeGrid.fromBytes(b"30373\n25512\n65332\n33549\n35390\n")
+    assert(ng.heights.tolist() == grid)
+    assert(ng.getTotalVisibleTrees() == 21)
+    assert(ng.getHighestScenicScore() == 8)
+    tg = TreeGrid(grid)
+    scores = ng.getScenicScores()
+    for i in range(len(grid)):
+        for j in range(len(grid[0])):
+            assert(scores[i][j] == tg.getScenicScore(i, j))
+    assert(NumpyTreeGrid([[1,2,3,1], [2,0,0,2]]).getTotalVisibleTrees() == 8)
+    assert(NumpyTreeGrid([[5]]).getTotalVisibleTrees() == 1)
+
+    fGrid = []
+    with open("8_input.txt", "r") as f:
+        fGrid.extend([int(element) for element in line.strip()] for line in f)
+    ng = NumpyTreeGrid.fromFile("8_input.txt")
+    assert(ng.heights.tolist() == fGrid)
+    assert((ng.getTotalVisibleTrees(), ng.getHighestScenicScore()) == TreeGrid(fGrid).getTotalVisibleTreesAndHighestScenicScore())
+
+def testGetHighestScenicScoreParallel():
+    ng = NumpyTreeGrid.fromBytes(b"30373\n25512\n65332\n33549\n35390\n")
+    for workers, strips in ((1, 1), (2, 2), (2, 3), (2, 50)):
+        assert(ng.getHighestScenicScoreParallel(workers, strips) == 8)
+    assert(NumpyTreeGrid.splitRange(5, 3) == [(0, 1), (1, 3), (3, 5)])
+    assert(NumpyTreeGrid.splitRange(2, 8) == [(0, 1), (1, 2)])
+    ng = NumpyTreeGrid.fromFile("8_input.txt")
+    assert(ng.getHighestScenicScoreParallel(2, 7) == ng.getHighestScenicScore())
+
 def main():
     fGrid = []
     with open("8_input.txt", "r") as f:
         fGrid.extend([int(element) for element in line.strip()] for line in f)
     tGrid = TreeGrid(fGrid)
-    totalTreesVisible = tGrid.getTotalVisibleTrees()
-    highestScenicScore = tGrid.getHighestScenicScore()
+    totalTreesVisible, highestScenicScore = tGrid.getTotalVisibleTreesAndHighestScenicScore()
     print(f"Trees visible: {totalTreesVisible}")
     print(f"Highest scenic score: {highestScenicScore}")
 
@@ -214,7 +573,13 @@ def runTests():
     testGetTotalVisibleTrees()
     testGetScenicScore()
     testGetHighestScenicScore()
+    testGetViewingDistanceGrids()
+    testHeightIndex()
+    if np is not None:
+        testNumpyTreeGrid()
+        testGetHighestScenicScoreParallel()
     print("All tests passed.")
 
-runTests()
-main()
\ No newline at end of file
+if __name__ == "__main__": # guard so that pool workers can import this module without re-running it
+    runTests()
+    main()
\ No newline at end of file
@@ -66,6 +66,9 @@ Case 4: row diff > 1 with diagonal
 .T...    .....
 .....    .....
 """
+from array import array
+from bisect import bisect_left, bisect_right
+
 offsetsByDirection = {
     #    row col
     'L': (0, -1),
@@ -140,16 +143,196 @@ def executeInstructionPart2(instruction, rope):
             visited.add(tuple(rope[9]))
     return visited
 
+class VisitedCells:
+    """
+    Cells visited by the tail, as single cells plus straight runs of cells that were added in bulk.
+    A run is stored as one interval on its row (horizontal) or column (vertical), so adding it costs O(1)
+    no matter how long it is. Runs and cells may overlap; count() only counts each cell once.
+    """
+    def __init__(self, cells=()):
+        self.cells = set(cells)
+        self.rowRuns = {} # row -> [(firstCol, lastCol), ...]
+        self.colRuns = {} # col -> [(firstRow, lastRow), ...]
+
+    def add(self, cell):
+        self.cells.add(tuple(cell))
+
+    def addRun(self, start, offset, length):
+        # the {length} cells start + offset, start + 2 * offset, ... start + length * offset
+        if length <= 0:
+            return
+        end = (start[0] + offset[0] * length, start[1] + offset[1] * length)
+        if offset[0] == 0:
+            first, last = sorted((start[1] + offset[1], end[1]))
+            self.rowRuns.setdefault(start[0], []).append((first, last))
+        else:
+            first, last = sorted((start[0] + offset[0], end[0]))
+            self.colRuns.setdefault(start[1], []).append((first, last))
+
+    @staticmethod
+    def mergeRuns(runs):
+        # sort and merge overlapping or touching intervals, for every row (or column)
+        merged = {}
+        for line, intervals in runs.items():
+            intervals = sorted(intervals)
+            lineMerged = [list(intervals[0])]
+            for first, last in intervals[1:]:
+                if first <= lineMerged[-1][1] + 1:
+                    lineMerged[-1][1] = max(lineMerged[-1][1], last)
+                else:
+                    lineMerged.append([first, last])
+            merged[line] = ([first for first, _ in lineMerged], [last for _, last in lineMerged])
+        return merged
+
+    @staticmethod
+    def isCovered(merged, line, x):
+        if line not in merged:
+            return False
+        firsts, lasts = merged[line]
+        i = bisect_right(firsts, x) - 1
+        return i >= 0 and x <= lasts[i]
+
+    def count(self):
+        """
+        Horizontal cells + vertical cells - cells that are on both a horizontal and a vertical run
+        + single cells that aren't on any run.
+        """
+        rows = VisitedCells.mergeRuns(self.rowRuns)
+        cols = VisitedCells.mergeRuns(self.colRuns)
+        total = sum(last - first + 1 for firsts, lasts in rows.values() for first, last in zip(firsts, lasts))
+        total += sum(last - first + 1 for firsts, lasts in cols.values() for first, last in zip(firsts, lasts))
+        sortedRows = sorted(rows)
+        for col, (firsts, lasts) in cols.items():
+            for first, last in zip(firsts, lasts):
+                for row in sortedRows[bisect_left(sortedRows, first):bisect_right(sortedRows, last)]:
+                    if VisitedCells.isCovered(rows, row, col):
+                        total -= 1
+        for row, col in self.cells:
+            if not VisitedCells.isCovered(rows, row, col) and not VisitedCells.isCovered(cols, col, row):
+                total += 1
+        return total
+
+def isTrailingLine(rope, offset):
+    # True if every knot is exactly one step behind the knot before it, with respect to the head's direction
+    for i in range(1, len(rope)):
+        if rope[i][0] != rope[i-1][0] - offset[0] or rope[i][1] != rope[i-1][1] - offset[1]:
+            return False
+    return True
+
+def executeInstructionRuns(instruction, rope, visited):
+    """
+    Move the rope like executeInstructionPart2(), for any number of knots, adding the tail's cells to {visited}.
+
+    Once the knots form a straight line trailing the head in the direction it's moving, every further step moves
+    every knot by one cell in that direction. So from there the rest of the instruction is applied in one go:
+    the tail's cells are added as a single run and every knot jumps by the remaining steps.
+    """
+    headOffset = offsetsByDirection.get(instruction[0])
+    steps = instruction[1]
+    while steps > 0:
+        # checking for the line costs O(knots), so only try it when it could skip more steps than that
+        if steps > len(rope) and isTrailingLine(rope, headOffset):
+            visited.addRun(tuple(rope[-1]), headOffset, steps)
+            for knot in rope:
+                knot[0] += headOffset[0] * steps
+                knot[1] += headOffset[1] * steps
+            return
+        moveHead(rope[0], headOffset)
+        for i in range(1, len(rope)):
+            if not moveTail(rope[i-1], rope[i]):
+                break
+        else:
+            visited.add(rope[-1])
+        steps -= 1
+
+class Rope:
+    """
+    A rope with any number of knots, all starting at (0, 0), that records the cells visited by a chosen set of knots.
+    Knot k's row and column are knots[2k] and knots[2k + 1] in one flat array('i'), instead of a list per knot.
+    That keeps huge ropes small in memory, but indexing the array is slower than a list per knot, so
+    countVisitedByTail() only uses it from ROPE_MIN_KNOTS knots up.
+
+    Like executeInstructionPart2(), a step stops at the first knot that doesn't move, since the knots behind it
+    can't move either. Like executeInstructionRuns(), once the rope trails the head in a straight line the rest
+    of the instruction is applied in bulk, with every tracked knot's cells added as one run.
+    """
+    def __init__(self, numKnots, trackedKnots=None):
+        self.numKnots = numKnots
+        self.knots = array('i', [0]) * (2 * numKnots)
+        if trackedKnots is None:
+            trackedKnots = [numKnots - 1] # just the tail
+        self.visited = {k: VisitedCells([(0, 0)]) for k in trackedKnots}
+        self.isTracked = bytearray(numKnots)
+        for k in trackedKnots:
+            self.isTracked[k] = 1
+        self.trackedCells = [self.visited[k].cells if self.isTracked[k] else None for k in range(numKnots)]
+
+    def getKnot(self, k):
+        return [self.knots[2*k], self.knots[2*k + 1]]
+
+    def isTrailingLine(self, offset):
+        knots = self.knots
+        for i in range(2, 2 * self.numKnots, 2):
+            if knots[i] != knots[i-2] - offset[0] or knots[i+1] != knots[i-1] - offset[1]:
+                return False
+        return True
+
+    def execute(self, instruction):
+        offset = offsetsByDirection.get(instruction[0])
+        steps = instruction[1]
+        # hoisted into locals, and tracked cells go straight into each VisitedCells' set, since this is the hot loop
+        knots = self.knots
+        isTracked = self.isTracked
+        cells = self.trackedCells
+        end = 2 * self.numKnots
+        dRow, dCol = offset
+        while steps > 0:
+            # like executeInstructionRuns(), only look for the line when it could skip more steps than it costs
+            if steps > self.numKnots and self.isTrailingLine(offset):
+                for k, visited in self.visited.items():
+                    visited.addRun((knots[2*k], knots[2*k + 1]), offset, steps)
+                for i in range(0, end, 2):
+                    knots[i] += dRow * steps
+                    knots[i+1] += dCol * steps
+                return
+            knots[0] += dRow
+            knots[1] += dCol
+            if isTracked[0]:
+                cells[0].add((knots[0], knots[1]))
+            for i in range(2, end, 2):
+                rowDiff = knots[i-2] - knots[i]
+                colDiff = knots[i-1] - knots[i+1]
+                if -1 <= rowDiff <= 1 and -1 <= colDiff <= 1:
+                    break # this knot stays put, and so does every knot behind it
+                # move one cell toward the knot ahead, diagonally if it's not in the same row or column
+                knots[i] += (rowDiff > 0) - (rowDiff < 0)
+                knots[i+1] += (colDiff > 0) - (colDiff < 0)
+                if isTracked[i >> 1]:
+                    cells[i >> 1].add((knots[i], knots[i+1]))
+            steps -= 1
+
+    def run(self, instructions):
+        # execute every instruction and return the number of cells visited by each tracked knot
+        for instruction in instructions:
+            self.execute(instruction)
+        return {k: visited.count() for k, visited in self.visited.items()}
+
+ROPE_MIN_KNOTS = 10000 # below this, a list per knot is small enough and faster to index than Rope's array('i')
+
+def countVisitedByTail(instructions, numKnots):
+    if numKnots >= ROPE_MIN_KNOTS:
+        return Rope(numKnots).run(instructions)[numKnots - 1]
+    rope = [[0, 0] for _ in range(numKnots)]
+    visited = VisitedCells([(0, 0)])
+    for instruction in instructions:
+        executeInstructionRuns(instruction, rope, visited)
+    return visited.count()
+
 def part2():
     instructions = None
     with open("9_input.txt", "r") as f:
         instructions = parseInstructions(f.readlines())
-    rope = [[0, 0] for _ in range(10)]
-    visited = {(0, 0)}
-    for instruction in instructions:
-        newlyVisited = executeInstructionPart2(instruction, rope)
-        visited = visited.union(newlyVisited)
-    print(f'The number of visited spots is {len(visited)}')
+    print(f'The number of visited spots is {countVisitedByTail(instructions, 10)}')
 
 #################
 # --- TESTS --- #
@@ -316,6 +499,64 @@ def testExecuteInstructionPart2():
         visited = visited.union(newlyVisited)
     print(f'The number of visited spots is {len(visited)}')
 
+def testExecuteInstructionRuns():
+    small = parseInstructions(["R 4", "U 4", "L 3", "D 1", "R 4", "D 1", "L 5", "R 2"])
+    large = parseInstructions(["R 5", "U 8", "L 8", "D 3", "R 17", "D 10", "L 25", "U 20"])
+    assert(countVisitedByTail(small, 2) == 13)
+    assert(countVisitedByTail(small, 10) == 1)
+    assert(countVisitedByTail(large, 10) == 36)
+
+    # a long straight move costs a handful of steps, then one run
+    rope = [[0, 0] for _ in range(10)]
+    visited = VisitedCells([(0, 0)])
+    executeInstructionRuns(('R', 1000000), rope, visited)
+    assert(rope[0] == [0, 1000000] and rope[9] == [0, 999991])
+    assert(visited.count() == 999992)
+
+    # runs that cross, overlap and cover single cells are only counted once
+    visited = VisitedCells([(0, 0), (0, 3), (5, 5)])
+    visited.addRun((0, 0), (0, 1), 4)   # (0, 1) .. (0, 4)
+    visited.addRun((0, 6), (0, -1), 3)  # (0, 5) .. (0, 3)
+    visited.addRun((-2, 2), (1, 0), 4)  # (-1, 2) .. (2, 2)
+    assert(visited.count() == 1 + 5 + 3 + 1)
+
+    with open("9_input.txt", "r") as f:
+        instructions = parseInstructions(f.readlines())
+    for numKnots in (2, 10):
+        rope = [[0, 0] for _ in range(numKnots)]
+        expected = {(0, 0)}
+        for instruction in instructions:
+            if numKnots == 2:
+                expected |= executeInstructionPart1(instruction, rope[0], rope[1])
+            else:
+                expected |= executeInstructionPart2(instruction, rope)
+        assert(countVisitedByTail(instructions, numKnots) == len(expected))
+
+def testRope():
+    small = parseInstructions(["R 4", "U 4", "L 3", "D 1", "R 4", "D 1", "L 5", "R 2"])
+    large = parseInstructions(["R 5", "U 8", "L 8", "D 3", "R 17", "D 10", "L 25", "U 20"])
+    # knot 1 of a 10-knot rope moves exactly like the tail of a 2-knot rope
+    assert(Rope(10, [1, 9]).run(small) == {1: 13, 9: 1})
+    assert(Rope(10, [0, 9]).run(large)[9] == 36)
+    rope = Rope(10)
+    rope.run(small)
+    assert(rope.getKnot(0) == [2, 2] and rope.getKnot(9) == [0, 0])
+
+    with open("9_input.txt", "r") as f:
+        instructions = parseInstructions(f.readlines())
+    counts = Rope(10, range(10)).run(instructions)
+    assert(counts[1] == Rope(2).run(instructions)[1])
+    assert(counts[9] == 2665)
+
+    # hundreds of knots, against the list-of-lists engine
+    instructions = large + [('U', 800), ('L', 3), ('R', 500)]
+    rope = [[0, 0] for _ in range(300)]
+    visited = VisitedCells([(0, 0)])
+    for instruction in instructions:
+        executeInstructionRuns(instruction, rope, visited)
+    assert(Rope(300).run(instructions)[299] == visited.count())
+    assert(countVisitedByTail(instructions, ROPE_MIN_KNOTS) == countVisitedByTail(instructions, ROPE_MIN_KNOTS - 1))
+
 #################
 # - END TESTS - #
 #################
@@ -326,5 +567,8 @@ def testExecuteInstructionPart2():
 #testVisualize()
 #testExecuteInstructionPart2()
 
+testExecuteInstructionRuns()
+testRope()
+
 #part1()
 part2()
\ No newline at end of file